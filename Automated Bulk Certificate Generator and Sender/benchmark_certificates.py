@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the certificate generation engine
+
+Generates synthetic rosters against the bundled template and reports certificates per
+second, the time spent in each stage and peak RSS. Results are written to JSON so runs
+from different versions can be compared (see --compare). With --startup it instead
+times a cold load of a synthetic registry from certificate_registry.json and from its
+binary cache.
+
+Usage:
+    python benchmark_certificates.py                         # 100, 10k and 100k recipients
+    python benchmark_certificates.py --sizes 100 1000 --workers 4
+    python benchmark_certificates.py --compare benchmark_results_old.json
+    python benchmark_certificates.py --startup               # 100k and 1M registry records
+"""
+
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(PROJECT_DIR, 'src')
+DEFAULT_CONFIG = os.path.join(PROJECT_DIR, 'data', 'certificates', 'config.json')
+DEFAULT_SIZES = [100, 10000, 100000]
+DEFAULT_STARTUP_SIZES = [100000, 1000000]
+
+FIRST_NAMES = ['James', 'María', 'Wei', 'Aisha', 'Olivia', 'Mohammed', 'Sofía', 'Liam',
+               'Chloé', 'Noah', 'Zoë', 'Ethan', 'Amara', 'Lucas', 'Ingrid', 'Kenji']
+LAST_NAMES = ['Smith', 'García', 'Chen', 'Okafor', 'Müller', 'Silva', 'Johansson', 'Kowalski',
+              'Dubois', 'Nakamura', 'Fernández', "O'Brien", 'Van der Berg', 'Rossi']
+COURSES = ['Python Workshop', 'Data Science Bootcamp',
+           'Docker for Absolute Beginners with Hands on Projects',
+           'Advanced Web Development', 'Machine Learning, Theory and Practice']
+
+
+def write_roster(path, size):
+    """Write a synthetic roster with unique names (quoted where they contain commas)"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(size):
+            name = f"{FIRST_NAMES[i % len(FIRST_NAMES)]} {LAST_NAMES[(i // len(FIRST_NAMES)) % len(LAST_NAMES)]} {i:06d}"
+            course = COURSES[i % len(COURSES)]
+            if ',' in course:
+                course = f'"{course}"'
+            f.write(f"{name},{course}\n")
+
+
+def prepare_workspace(workspace, config_file, size):
+    """Lay out data/certificates in a scratch directory so the real registry is never touched"""
+    base_dir = os.path.join(workspace, 'data', 'certificates')
+    os.makedirs(os.path.join(base_dir, 'templates'), exist_ok=True)
+    config_dir = os.path.dirname(os.path.abspath(config_file))
+    
+    with open(config_file, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    
+    template_name = os.path.basename(config['template_pdf'])
+    shutil.copy(os.path.join(config_dir, config['template_pdf']),
+                os.path.join(base_dir, 'templates', template_name))
+    config['template_pdf'] = f"templates/{template_name}"
+    config['output_directory'] = 'output'
+    
+    # Font paths are relative to the original config, so pin them
+    for weights in config.get('fonts', {}).values():
+        for weight, font_path in weights.items():
+            weights[weight] = os.path.abspath(os.path.join(config_dir, font_path))
+    
+    with open(os.path.join(base_dir, 'config.json'), 'w', encoding='utf-8') as f:
+        json.dump(config, f, indent=2)
+    write_roster(os.path.join(base_dir, 'recipients.txt'), size)
+    return base_dir
+
+
+class StageTimer:
+    """Exclusive wall-clock time per stage; nested stages are not counted twice"""
+    
+    def __init__(self):
+        self.totals = {}
+        self._stack = []
+    
+    def wrap(self, stage, function):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            self._stack.append(0.0)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                nested = self._stack.pop()
+                elapsed = time.perf_counter() - start
+                self.totals[stage] = self.totals.get(stage, 0.0) + elapsed - nested
+                if self._stack:
+                    self._stack[-1] += elapsed
+        return timed
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process and its workers in MB (None where unsupported)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(peak / divisor, 1)
+
+
+def run_single(size, workers, combined, config_file, keep_output):
+    """Run one benchmark in this process and return its result dictionary"""
+    sys.path.insert(0, SRC_DIR)
+    from PyPDF2 import PdfWriter
+    from PyPDF2._page import PageObject
+    from automations import fill_certificates
+    from utils import certificate_registry, registry_store
+    from utils.pdf_stream import StreamingPdfWriter
+    
+    workspace = tempfile.mkdtemp(prefix='cert_bench_')
+    try:
+        prepare_workspace(workspace, config_file, size)
+        os.chdir(workspace)
+        
+        timer = StageTimer()
+        for stage, name in [('template_load', 'load_template'),
+                            ('text_stamp', 'stamp_text_direct'),
+                            ('text_stamp', '_text_operators'),
+                            ('overlay_build', 'create_text_overlay')]:
+            setattr(fill_certificates, name, timer.wrap(stage, getattr(fill_certificates, name)))
+        PageObject.merge_page = timer.wrap('merge', PageObject.merge_page)
+        PdfWriter.write = timer.wrap('write', PdfWriter.write)
+        StreamingPdfWriter.write_object = timer.wrap('write', StreamingPdfWriter.write_object)
+        registry_class = certificate_registry.CertificateRegistry
+        store_class = registry_store.JsonJournalStore
+        # Batched changes reach the journal through _write_entries when the batch exits
+        for name in ('_append', '_write_entries', 'compact'):
+            setattr(store_class, name, timer.wrap('registry_save', getattr(store_class, name)))
+        registry_class.export_to_legacy_log = timer.wrap('legacy_log_export',
+                                                         registry_class.export_to_legacy_log)
+        
+        # Drop each PDF once it is registered so 100k-recipient runs don't fill the disk
+        output_bytes = [0]
+        register_many = registry_class.register_many
+        
+        def register_and_discard(self, certificates):
+            records = register_many(self, certificates)
+            for record in records:
+                pdf_path = record['pdf_path']
+                if pdf_path and not combined and os.path.exists(pdf_path):
+                    output_bytes[0] += os.path.getsize(pdf_path)
+                    if not keep_output:
+                        os.remove(pdf_path)
+            return records
+        
+        registry_class.register_many = register_and_discard
+        
+        start = time.perf_counter()
+        with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+            results = fill_certificates.generate_certificates(
+                'recipients.txt', 'config.json', 'data/certificates', workers=workers,
+                combined_output='combined.pdf' if combined else None)
+        elapsed = time.perf_counter() - start
+        
+        if combined:
+            output_bytes[0] = os.path.getsize(os.path.join(results['output_directory'], 'combined.pdf'))
+        
+        stages = {stage: round(seconds, 4) for stage, seconds in sorted(timer.totals.items())}
+        stages['other'] = round(max(0.0, elapsed - sum(timer.totals.values())), 4)
+        
+        return {
+            'recipients': size,
+            'workers': workers,
+            'mode': 'combined' if combined else 'files',
+            'generated': results['generated'],
+            'failed': results['failed'],
+            'seconds': round(elapsed, 3),
+            'certificates_per_second': round(results['generated'] / elapsed, 2) if elapsed else None,
+            'stages': stages,
+            'stages_note': None if workers == 1 else 'fill stages run in worker processes and are not included',
+            'output_bytes': output_bytes[0],
+            'peak_rss_mb': peak_rss_mb(),
+        }
+    finally:
+        # Close the global registry while its relative paths still point at the workspace
+        certificate_registry.close_registry()
+        os.chdir(PROJECT_DIR)
+        shutil.rmtree(workspace, ignore_errors=True)
+
+
+def write_registry(base_dir, size):
+    """Write a certificate_registry.json with size synthetic records"""
+    from utils.certificate_registry import KEY_FORMAT, CertificateRegistry
+    
+    registry = CertificateRegistry(base_dir, backend='json')
+    certificates = {}
+    for i in range(size):
+        name = f"{FIRST_NAMES[i % len(FIRST_NAMES)]} {LAST_NAMES[(i // len(FIRST_NAMES)) % len(LAST_NAMES)]} {i:07d}"
+        key, record = registry._build_record(name, COURSES[i % len(COURSES)], f"BENCH{i:015d}",
+                                             pdf_path=f"output/{i:07d}.pdf", fingerprint=f"{i:064x}",
+                                             size_before=180000, size_after=90000)
+        record['registry_seq'] = i + 1
+        record['email_sent'] = i % 2 == 0
+        certificates[key] = record
+    
+    now = datetime.now().isoformat()
+    metadata = {'created': now, 'last_updated': now, 'version': '1.0', 'key_format': KEY_FORMAT,
+                'registry_seq': size}
+    with open(registry.registry_file, 'w', encoding='utf-8') as f:
+        json.dump({'certificates': certificates, 'metadata': metadata}, f, indent=2, ensure_ascii=False)
+    return registry.registry_file
+
+
+def run_startup(size):
+    """Time cold registry loads from the JSON snapshot and from the binary cache"""
+    sys.path.insert(0, SRC_DIR)
+    from utils import registry_store
+    from utils.certificate_registry import CertificateRegistry
+    
+    workspace = tempfile.mkdtemp(prefix='registry_bench_')
+    try:
+        base_dir = os.path.join(workspace, 'certificates')
+        os.makedirs(base_dir)
+        snapshot_file = write_registry(base_dir, size)
+        cache_file = f"{os.path.splitext(snapshot_file)[0]}.cache"
+        gc.collect()
+        
+        timer = StageTimer()
+        store_class = registry_store.JsonJournalStore
+        store_class._write_cache = timer.wrap('cache_write', store_class._write_cache)
+        with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            registry = CertificateRegistry(base_dir, backend='json')
+            json_seconds = time.perf_counter() - start - timer.totals.get('cache_write', 0.0)
+            loaded = len(registry.get_all_certificates())
+            del registry
+            gc.collect()
+            
+            start = time.perf_counter()
+            CertificateRegistry(base_dir, backend='json')
+            cache_seconds = time.perf_counter() - start
+        
+        return {
+            'records': size,
+            'mode': 'startup',
+            'loaded': loaded,
+            'snapshot_bytes': os.path.getsize(snapshot_file),
+            'cache_bytes': os.path.getsize(cache_file),
+            'json_load_seconds': round(json_seconds, 3),
+            'cache_write_seconds': round(timer.totals.get('cache_write', 0.0), 3),
+            'cache_load_seconds': round(cache_seconds, 3),
+            'speedup': round(json_seconds / cache_seconds, 1) if cache_seconds else None,
+            'peak_rss_mb': peak_rss_mb(),
+        }
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+
+
+def run_isolated(size, args):
+    """Run one benchmark size in a fresh interpreter so peak RSS and caches are per size"""
+    if args.startup:
+        command = [sys.executable, os.path.abspath(__file__), '--run-startup', str(size)]
+        completed = subprocess.run(command, capture_output=True, text=True)
+        if completed.returncode != 0:
+            raise RuntimeError(f"Startup benchmark for {size} records failed:\n{completed.stderr}")
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+    
+    command = [sys.executable, os.path.abspath(__file__), '--run-one', str(size),
+               '--workers', str(args.workers), '--config', args.config]
+    if args.combined:
+        command.append('--combined')
+    if args.keep_output:
+        command.append('--keep-output')
+    
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Benchmark for {size} recipients failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def git_commit():
+    """Current commit hash, if the project is a git checkout"""
+    try:
+        completed = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_DIR,
+                                   capture_output=True, text=True)
+        return completed.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_result(result):
+    print(f"\n📊 {result['recipients']:,} recipients ({result['mode']}, {result['workers']} worker(s))")
+    print(f"   Generated: {result['generated']:,}  Failed: {result['failed']}")
+    print(f"   Time: {result['seconds']:.2f}s  →  {result['certificates_per_second']:,.1f} certificates/sec")
+    if result['peak_rss_mb'] is not None:
+        print(f"   Peak RSS: {result['peak_rss_mb']:.1f} MB")
+    print(f"   Output: {result['output_bytes'] / (1024 * 1024):,.1f} MB")
+    total = result['seconds'] or 1
+    for stage, seconds in result['stages'].items():
+        print(f"     {stage:<18} {seconds:>10.3f}s  {seconds / total * 100:5.1f}%")
+    if result['stages_note']:
+        print(f"   Note: {result['stages_note']}")
+
+
+def print_startup_result(result):
+    print(f"\n📊 {result['records']:,} registry records")
+    print(f"   Snapshot: {result['snapshot_bytes'] / (1024 * 1024):,.1f} MB JSON, "
+          f"{result['cache_bytes'] / (1024 * 1024):,.1f} MB cache")
+    print(f"   JSON load:  {result['json_load_seconds']:.3f}s (+ {result['cache_write_seconds']:.3f}s writing the cache)")
+    print(f"   Cache load: {result['cache_load_seconds']:.3f}s  →  {result['speedup']}x faster")
+    if result['peak_rss_mb'] is not None:
+        print(f"   Peak RSS: {result['peak_rss_mb']:.1f} MB")
+
+
+def compare_results(baseline_file, results, threshold):
+    """Print throughput changes against a previous results file; return False on a regression"""
+    with open(baseline_file, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    
+    previous = {(r['recipients'], r['workers'], r['mode']): r for r in baseline.get('results', [])}
+    ok = True
+    print(f"\n📈 Comparison with {baseline_file} (commit {baseline.get('git_commit') or 'unknown'})")
+    for result in results:
+        old = previous.get((result['recipients'], result['workers'], result['mode']))
+        if not old or not old.get('certificates_per_second'):
+            print(f"   {result['recipients']:>9,}: no baseline")
+            continue
+        change = (result['certificates_per_second'] / old['certificates_per_second'] - 1) * 100
+        marker = '✅'
+        if change < -threshold:
+            marker = '❌'
+            ok = False
+        print(f"   {result['recipients']:>9,}: {old['certificates_per_second']:,.1f} → "
+              f"{result['certificates_per_second']:,.1f} certs/sec ({change:+.1f}%) {marker}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark certificate generation throughput')
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        help='Roster sizes to benchmark (default: 100 10000 100000; '
+                             'with --startup, registry sizes: 100000 1000000)')
+    parser.add_argument('--workers', '-w', type=int, default=1,
+                        help='Worker processes passed to generate_certificates (default: 1)')
+    parser.add_argument('--combined', action='store_true',
+                        help='Benchmark the combined print PDF mode instead of one file per recipient')
+    parser.add_argument('--config', type=str, default=DEFAULT_CONFIG,
+                        help='Certificate config whose template and fields are used')
+    parser.add_argument('--output', '-o', type=str, default='benchmark_results.json',
+                        help='Where to write the JSON results (default: benchmark_results.json)')
+    parser.add_argument('--compare', type=str,
+                        help='Previous results file to compare throughput against')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='Slowdown in percent that counts as a regression (default: 10)')
+    parser.add_argument('--keep-output', action='store_true',
+                        help="Keep generated PDFs in the scratch directory until the run ends")
+    parser.add_argument('--startup', action='store_true',
+                        help='Benchmark registry load time (JSON vs binary cache) instead of generation')
+    parser.add_argument('--run-one', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--run-startup', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.config = os.path.abspath(args.config)
+    if args.sizes is None:
+        args.sizes = DEFAULT_STARTUP_SIZES if args.startup else DEFAULT_SIZES
+    if args.startup and args.compare:
+        parser.error('--compare only applies to generation benchmarks')
+    if args.combined and args.workers > 1:
+        parser.error('--combined is written by a single process and can\'t be used with --workers')
+    
+    if args.run_one is not None or args.run_startup is not None:
+        # Child process: print the single result as the last line of stdout
+        if args.run_startup is not None:
+            result = run_startup(args.run_startup)
+        else:
+            result = run_single(args.run_one, args.workers, args.combined, args.config, args.keep_output)
+        print(json.dumps(result))
+        return
+    
+    print("⏱️  REGISTRY STARTUP BENCHMARK" if args.startup else "⏱️  CERTIFICATE GENERATION BENCHMARK")
+    print("=" * 60)
+    
+    results = []
+    for size in args.sizes:
+        print(f"\nRunning {size:,} {'registry records' if args.startup else 'recipients'}...")
+        result = run_isolated(size, args)
+        if args.startup:
+            print_startup_result(result)
+        else:
+            print_result(result)
+        results.append(result)
+    
+    report = {
+        'generated_at': datetime.now().isoformat(),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'config': os.path.relpath(args.config, PROJECT_DIR),
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Results saved to: {args.output}")
+    
+    if args.compare and not compare_results(args.compare, results, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
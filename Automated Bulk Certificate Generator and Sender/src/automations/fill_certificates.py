@@ -1,21 +1,33 @@
 import os
 import json
 import csv
+import hashlib
 import secrets
 import string
+import zlib
 from pathlib import Path
 from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2.generic import (ArrayObject, DecodedStreamObject, DictionaryObject, EncodedStreamObject,
+                            NameObject, NumberObject)
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.lib import colors
 from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Tuple
 import tempfile
 
 # Import certificate registry for data integrity
 try:
     from ..utils.certificate_registry import get_registry, register_certificate
+    from ..utils.fonts import (EMBEDDED_ENCODING, get_embedded_font, is_truetype_font,
+                               register_config_fonts, string_width)
+    from ..utils.pdf_optimize import optimize_page
+    from ..utils.pdf_stream import StreamingPdfWriter
+    from ..utils.recipients import certificate_filename, iter_chunks, iter_recipients
 except ImportError:
     # Fallback for when running as a script
     import sys
@@ -27,6 +39,12 @@ except ImportError:
     sys.path.insert(0, utils_dir)
     sys.path.insert(0, parent_dir)
     
+    from utils.fonts import (EMBEDDED_ENCODING, get_embedded_font, is_truetype_font,
+                             register_config_fonts, string_width)
+    from utils.pdf_optimize import optimize_page
+    from utils.pdf_stream import StreamingPdfWriter
+    from utils.recipients import certificate_filename, iter_chunks, iter_recipients
+    
     try:
         from utils.certificate_registry import get_registry, register_certificate
     except ImportError:
@@ -44,37 +62,40 @@ def generate_certificate_id():
     return ''.join(secrets.choice(characters) for _ in range(20))
 
 
+# Text rendering engines: 'auto' stamps text straight into the page content stream and
+# falls back to the reportlab overlay when it can't; 'reportlab' always uses the overlay
+RENDER_ENGINES = ('auto', 'reportlab')
+
+# The standard PDF fonts, which every viewer provides without embedding
+STANDARD_FONTS = frozenset(pdfmetrics.standardFonts)
+
+# Font families rendered with a standard family when no TTF is configured for them
+FONT_FAMILY_ALIASES = {'Roboto': 'Helvetica'}
+
+# PDF text encoding used for standard (non-embedded) fonts
+STANDARD_FONT_ENCODING = 'cp1252'
+
+
 def load_recipients(recipients_file):
-    """Load recipients from comma-separated file"""
-    recipients = []
+    """Load all recipients from a comma-separated file (see iter_recipients for streaming)"""
+    def warn(line_num, message):
+        print(f"Warning: line {line_num}: {message}")
+    
     try:
-        with open(recipients_file, 'r', encoding='utf-8') as f:
-            for line_num, line in enumerate(f, 1):
-                line = line.strip()
-                # Skip empty lines and comments
-                if not line or line.startswith('#'):
-                    continue
-                
-                # Split by comma
-                parts = line.split(',')
-                if len(parts) >= 2:
-                    recipients.append({
-                        'name': parts[0].strip(),
-                        'course': parts[1].strip()
-                    })
-                else:
-                    print(f"Warning: Invalid format on line {line_num} in {recipients_file}. Expected format: Name,Course")
-                    
+        return list(iter_recipients(recipients_file, on_error=warn))
     except FileNotFoundError:
         raise FileNotFoundError(f"Recipients file not found: {recipients_file}")
     except Exception as e:
         raise Exception(f"Error reading recipients file: {str(e)}")
-    
-    return recipients
 
 
-def load_config(config_file):
-    """Load certificate configuration from JSON file"""
+def load_config(config_file, base_dir=None):
+    """
+    Load certificate configuration from JSON file
+    
+    Font files in the optional "fonts" section are resolved relative to base_dir
+    (default: the config file's directory) and registered once.
+    """
     try:
         with open(config_file, 'r', encoding='utf-8') as f:
             config = json.load(f)
@@ -84,6 +105,26 @@ def load_config(config_file):
             if key not in config:
                 raise KeyError(f"Missing required configuration key: {key}")
         
+        render_engine = config.get('render_engine', 'auto')
+        if render_engine not in RENDER_ENGINES:
+            raise ValueError(f"Invalid render_engine '{render_engine}'. Expected one of: {', '.join(RENDER_ENGINES)}")
+        
+        # Resolve and register configured TrueType fonts
+        if base_dir is None:
+            base_dir = os.path.dirname(config_file)
+        config['fonts'] = {
+            family: {weight: os.path.abspath(os.path.join(base_dir, path)) for weight, path in weights.items()}
+            for family, weights in config.get('fonts', {}).items()
+        }
+        register_config_fonts(config)
+        
+        font_family = config.get('font_family', 'Helvetica')
+        if font_family in FONT_FAMILY_ALIASES and font_family not in config['fonts']:
+            print(f"Warning: no font files configured for '{font_family}', using {FONT_FAMILY_ALIASES[font_family]}")
+        
+        # Reject invalid fonts, colors and alignments now rather than per recipient
+        compile_render_plan(config)
+        
         return config
     except FileNotFoundError:
         raise FileNotFoundError(f"Configuration file not found: {config_file}")
@@ -91,131 +132,593 @@ def load_config(config_file):
         raise Exception(f"Invalid JSON in configuration file: {str(e)}")
 
 
-def create_text_overlay(config, recipient_data, page_width, page_height):
+def _align_left(x, text, font_name, font_size):
+    """Left alignment: the text starts at x"""
+    return x
+
+
+def _align_center(x, text, font_name, font_size):
+    """Center alignment: the text is centered on x"""
+    return x - string_width(text, font_name, font_size) / 2
+
+
+def _align_right(x, text, font_name, font_size):
+    """Right alignment: the text ends at x"""
+    return x - string_width(text, font_name, font_size)
+
+
+# Alignment name -> function returning the x where drawing starts
+ALIGNMENTS = {'left': _align_left, 'center': _align_center, 'right': _align_right}
+
+
+@dataclass(frozen=True)
+class FieldPlan:
+    """Resolved rendering settings for a single text field"""
+    name: str
+    x: float
+    y: float
+    font_name: str
+    font_size: float
+    rgb: Tuple[float, float, float]
+    align: Callable[[float, str, str, float], float]
+    encoding: str  # Text encoding for the direct engine
+    resource_name: str
+    text_operators: bytes  # Precompiled "BT /Font size Tf r g b rg " for the direct engine
+    
+    def start_x(self, text):
+        """Get the x coordinate where this field's text starts"""
+        return self.align(self.x, text, self.font_name, self.font_size)
+
+
+@dataclass(frozen=True)
+class RenderPlan:
+    """Immutable rendering plan compiled once per run from config.json"""
+    fields: Tuple[FieldPlan, ...]
+    direct: bool  # True if text can be stamped without the reportlab overlay
+    
+    def fingerprint(self):
+        """Get a stable hash of the compiled field settings"""
+        settings = [(f.name, f.x, f.y, f.font_name, f.font_size, f.rgb, f.align.__name__)
+                    for f in self.fields]
+        return hashlib.sha256(json.dumps([settings, self.direct]).encode('utf-8')).hexdigest()
+    
+    def layout(self, recipient_data):
+        """Yield (field, text, x) for every field the recipient has text for"""
+        for field in self.fields:
+            text = recipient_data.get(field.name)
+            if text:
+                yield field, text, field.start_x(text)
+
+
+def _resolve_font_name(font_family, font_weight):
+    """Resolve the registered font for a family and weight, raising ValueError if unavailable"""
+    if font_weight not in ('normal', 'bold'):
+        raise ValueError(f"Invalid font_weight '{font_weight}'. Expected 'normal' or 'bold'")
+    
+    font_name = f"{font_family}-Bold" if font_weight == 'bold' else font_family
+    try:
+        pdfmetrics.getFont(font_name)
+        return font_name
+    except KeyError:
+        pass
+    
+    if font_family in FONT_FAMILY_ALIASES:
+        return _resolve_font_name(FONT_FAMILY_ALIASES[font_family], font_weight)
+    raise ValueError(f"Font not available: {font_name} (font_family '{font_family}', font_weight '{font_weight}')")
+
+
+def _normalize_color(color):
+    """Normalize a 0-255 or 0-1 RGB color to a tuple of 0-1 floats"""
+    if len(color) != 3 or not all(isinstance(c, (int, float)) for c in color):
+        raise ValueError(f"Invalid color {color}. Expected [r, g, b]")
+    
+    if all(0 <= c <= 1 for c in color):
+        # Already normalized (0-1)
+        return tuple(float(c) for c in color)
+    # Convert from 0-255 to 0-1
+    return tuple(c / 255 for c in color)
+
+
+def compile_render_plan(config):
+    """
+    Compile the field configuration into an immutable render plan
+    
+    Fonts, colors and alignment are resolved once here, so rendering a recipient
+    only supplies the text.
+    
+    Raises:
+        ValueError: If a field has an unavailable font, bad color or unknown alignment
+    """
+    register_config_fonts(config)
+    font_family = config.get('font_family', 'Helvetica')
+    fields = []
+    resource_names = {}  # font name -> page font resource name, shared by fields using the same font
+    
+    for field_name, field_config in config['fields'].items():
+        font_name = _resolve_font_name(font_family, field_config.get('font_weight', 'normal'))
+        font_size = field_config['font_size']
+        rgb = _normalize_color(field_config.get('color', [0, 0, 0]))
+        
+        alignment = field_config.get('alignment', 'left')
+        if alignment not in ALIGNMENTS:
+            raise ValueError(f"Invalid alignment '{alignment}' for field '{field_name}'. "
+                             f"Expected one of: {', '.join(ALIGNMENTS)}")
+        
+        resource_name = resource_names.setdefault(font_name, f"/CertStampF{len(resource_names) + 1}")
+        text_operators = (f"BT {resource_name} {_format_number(font_size)} Tf "
+                          f"{' '.join(_format_number(c) for c in rgb)} rg ").encode('ascii')
+        
+        fields.append(FieldPlan(
+            name=field_name,
+            x=field_config['x'],
+            y=field_config['y'],
+            font_name=font_name,
+            font_size=font_size,
+            rgb=rgb,
+            align=ALIGNMENTS[alignment],
+            encoding=STANDARD_FONT_ENCODING if font_name in STANDARD_FONTS else EMBEDDED_ENCODING,
+            resource_name=resource_name,
+            text_operators=text_operators
+        ))
+    
+    # The direct engine handles standard fonts and embedded TrueType subsets
+    direct = (config.get('render_engine', 'auto') != 'reportlab'
+              and all(field.font_name in STANDARD_FONTS or is_truetype_font(field.font_name)
+                      for field in fields))
+    
+    return RenderPlan(fields=tuple(fields), direct=direct)
+
+
+def create_text_overlay(config, recipient_data, page_width, page_height, plan=None):
     """Create a PDF overlay with text fields"""
+    if plan is None:
+        plan = compile_render_plan(config)
+    
     buffer = BytesIO()
     
     # Create canvas with the same page size as template
     c = canvas.Canvas(buffer, pagesize=(page_width, page_height))
     
-    # Get font family from config
-    font_family = config.get('font_family', 'Helvetica')
-    
-    # Process each field
-    for field_name, field_config in config['fields'].items():
-        if field_name in recipient_data and recipient_data[field_name]:
-            text = recipient_data[field_name]
-            x = field_config['x']
-            y = field_config['y']
-            font_size = field_config['font_size']
-            font_weight = field_config.get('font_weight', 'normal')
-            color = field_config.get('color', [0, 0, 0])
-            alignment = field_config.get('alignment', 'left')
-            
-            # Set font
-            if font_weight == 'bold':
-                if font_family == 'Roboto':
-                    # Fallback to Helvetica since Roboto may not be available
-                    font_name = "Helvetica-Bold"
-                else:
-                    font_name = f"{font_family}-Bold"
-            else:
-                if font_family == 'Roboto':
-                    # Fallback to Helvetica since Roboto may not be available
-                    font_name = "Helvetica"
-                else:
-                    font_name = font_family
-            
-            try:
-                c.setFont(font_name, font_size)
-            except:
-                # Final fallback to Helvetica if font not found
-                fallback_font = "Helvetica-Bold" if font_weight == 'bold' else "Helvetica"
-                c.setFont(fallback_font, font_size)
-            
-            # Set color (convert if needed)
-            if all(isinstance(c, (int, float)) and 0 <= c <= 1 for c in color):
-                # Already normalized (0-1)
-                c.setFillColorRGB(color[0], color[1], color[2])
-            else:
-                # Convert from 0-255 to 0-1
-                c.setFillColorRGB(color[0]/255, color[1]/255, color[2]/255)
-            
-            # Handle text alignment
-            if alignment == 'center':
-                text_width = c.stringWidth(text, font_name, font_size)
-                x = x - (text_width / 2)
-            elif alignment == 'right':
-                text_width = c.stringWidth(text, font_name, font_size)
-                x = x - text_width
-            
-            # Draw text
-            c.drawString(x, y, text)
+    for field, text, x in plan.layout(recipient_data):
+        c.setFont(field.font_name, field.font_size)
+        c.setFillColorRGB(*field.rgb)
+        c.drawString(x, field.y, text)
     
     c.save()
     buffer.seek(0)
     return buffer
 
 
-def fill_certificate(template_path, config, recipient_data, output_path):
-    """Fill a certificate template with recipient data"""
+def _format_number(value):
+    """Format a number compactly for a PDF content stream"""
+    return f"{value:.4f}".rstrip('0').rstrip('.')
+
+
+def _pdf_literal_string(data):
+    """Encode bytes as a PDF literal string, escaping delimiters and non-printable bytes"""
+    out = bytearray(b'(')
+    for byte in data:
+        if byte in (0x28, 0x29, 0x5C):  # ( ) backslash
+            out += b'\\' + bytes([byte])
+        elif 32 <= byte < 127:
+            out.append(byte)
+        else:
+            out += b'\\%03o' % byte
+    out += b')'
+    return bytes(out)
+
+
+def _stream_object(data):
+    """Create an uncompressed PDF stream holding the given bytes"""
+    stream = DecodedStreamObject()
+    stream.set_data(data)
+    return stream
+
+
+def _compressed_stream_object(data):
+    """Create a Flate-compressed PDF stream holding the given bytes"""
+    stream = EncodedStreamObject()
+    stream[NameObject('/Filter')] = NameObject('/FlateDecode')
+    stream._data = zlib.compress(data)
+    return stream
+
+
+def _text_operators(plan, recipient_data):
+    """
+    Build the content stream operators that draw a recipient's text
+    
+    Returns:
+        tuple: (operators, {resource name: font name}), or None if the text can't be
+        encoded in the fields' single-byte font encodings
+    """
+    operators = []
+    used_fonts = {}
+    
+    for field, text, x in plan.layout(recipient_data):
+        try:
+            encoded_text = text.encode(field.encoding)
+        except UnicodeEncodeError:
+            # Characters outside the single-byte font encoding need the reportlab path
+            return None
+        
+        operators.append(field.text_operators
+                         + f"1 0 0 1 {_format_number(x)} {_format_number(field.y)} Tm ".encode('ascii')
+                         + _pdf_literal_string(encoded_text) + b" Tj ET\n")
+        used_fonts[field.resource_name] = field.font_name
+    
+    return b"".join(operators), used_fonts
+
+
+def _standard_font_dict(font_name):
+    """Create the font dictionary for one of the standard (non-embedded) PDF fonts"""
+    font = DictionaryObject({
+        NameObject('/Type'): NameObject('/Font'),
+        NameObject('/Subtype'): NameObject('/Type1'),
+        NameObject('/BaseFont'): NameObject(f"/{font_name}")
+    })
+    if font_name not in ('Symbol', 'ZapfDingbats'):
+        font[NameObject('/Encoding')] = NameObject('/WinAnsiEncoding')
+    return font
+
+
+def stamp_text_direct(writer, page, plan, recipient_data):
+    """
+    Stamp recipient text onto a page by appending a raw content stream
+    
+    Bypasses the reportlab canvas and merge_page(): the original contents are wrapped
+    in q/Q and a small stream of text operators is appended after them. Standard
+    fonts are referenced by name; TrueType fonts are embedded as a subset built once
+    per run and added once to this page's writer.
+    
+    Returns:
+        bool: False (page untouched) if the text can't be drawn this way
+    """
+    if not plan.direct:
+        return False
+    
+    text = _text_operators(plan, recipient_data)
+    if text is None:
+        return False
+    operators, used_fonts = text
+    
+    # Make sure the page has its own font dictionary to add the stamp fonts to
+    if '/Resources' not in page:
+        page[NameObject('/Resources')] = DictionaryObject()
+    resources = page['/Resources']
+    if '/Font' not in resources:
+        resources[NameObject('/Font')] = DictionaryObject()
+    fonts = resources['/Font']
+    
+    if any(resource_name in fonts for resource_name in used_fonts):
+        return False
+    
+    for resource_name, font_name in used_fonts.items():
+        if font_name in STANDARD_FONTS:
+            fonts[NameObject(resource_name)] = writer._add_object(_standard_font_dict(font_name))
+        else:
+            fonts[NameObject(resource_name)] = get_embedded_font(font_name).add_to_writer(writer)
+    
+    # Wrap the template contents in q/Q so its graphics state can't leak into the stamp
+    contents = []
+    if '/Contents' in page:
+        raw_contents = page.raw_get('/Contents')
+        if isinstance(raw_contents.get_object(), ArrayObject):
+            contents = list(raw_contents.get_object())
+        else:
+            contents = [raw_contents]
+    
+    page[NameObject('/Contents')] = ArrayObject(
+        [writer._add_object(_stream_object(b"q\n"))]
+        + contents
+        + [writer._add_object(_stream_object(b"Q\n" + operators))]
+    )
+    return True
+
+
+# Parsed and optimized template pages (with their optimization stats) keyed by
+# (absolute path, mtime) so each template is parsed once per run
+_template_cache = {}
+
+
+def load_template(template_path):
+    """
+    Return the optimized first page of a template PDF and its OptimizationStats
+    
+    The file is parsed and optimized only once per version: duplicate streams are shared
+    and uncompressed streams compressed, so every certificate cloned from the page is
+    smaller without any per-certificate work.
+    """
+    abs_path = os.path.abspath(template_path)
+    cache_key = (abs_path, os.path.getmtime(abs_path))
+    
+    template = _template_cache.get(cache_key)
+    if template is None:
+        # Drop entries for older versions of the same template
+        for stale_key in [key for key in _template_cache if key[0] == abs_path]:
+            del _template_cache[stale_key]
+        
+        template_reader = PdfReader(abs_path)
+        template = optimize_page(template_reader.pages[0])
+        _template_cache[cache_key] = template
+    
+    return template
+
+
+def load_template_page(template_path):
+    """Return the optimized first page of a template PDF, parsing the file only once per version"""
+    return load_template(template_path)[0]
+
+
+def fill_certificate(template_path, config, recipient_data, output_path, plan=None):
+    """
+    Fill a certificate template with recipient data
+    
+    Text is stamped directly into the page content stream when possible; otherwise a
+    reportlab overlay is built and merged. Pass a plan from compile_render_plan() to
+    avoid recompiling the field configuration for every recipient.
+    
+    Returns:
+        int: Bytes the output optimization saved on this file
+    """
     try:
-        # Read template PDF
-        with open(template_path, 'rb') as template_file:
-            template_reader = PdfReader(template_file)
-            template_page = template_reader.pages[0]
-            
-            # Get page dimensions
+        # Get the cached, optimized template page (parsed once per run)
+        template_page, template_stats = load_template(template_path)
+        bytes_saved = template_stats.bytes_saved
+        
+        # Clone the cached page into a fresh writer so the cached template is never modified
+        writer = PdfWriter()
+        output_page = writer.add_page(template_page)
+        
+        if plan is None:
+            plan = compile_render_plan(config)
+        
+        if not stamp_text_direct(writer, output_page, plan, recipient_data):
+            # Fallback: reportlab overlay merged onto the page
             page_width = float(template_page.mediabox.width)
             page_height = float(template_page.mediabox.height)
             
-            # Create text overlay
-            overlay_buffer = create_text_overlay(config, recipient_data, page_width, page_height)
+            overlay_buffer = create_text_overlay(config, recipient_data, page_width, page_height, plan)
             overlay_reader = PdfReader(overlay_buffer)
-            overlay_page = overlay_reader.pages[0]
-            
-            # Merge template and overlay
-            template_page.merge_page(overlay_page)
-            
-            # Write output
-            writer = PdfWriter()
-            writer.add_page(template_page)
-            
-            with open(output_path, 'wb') as output_file:
-                writer.write(output_file)
+            # Clone the overlay into the writer first so its resources are written with the page
+            output_page.merge_page(overlay_reader.pages[0].clone(writer))
+            # merge_page() leaves the merged contents as a direct, uncompressed stream;
+            # PDF needs it indirect, and compressing it keeps the fallback output small
+            merged_data = output_page['/Contents'].get_data()
+            merged_contents = _compressed_stream_object(merged_data)
+            output_page[NameObject('/Contents')] = writer._add_object(merged_contents)
+            bytes_saved += len(merged_data) - len(merged_contents._data)
+        
+        with open(output_path, 'wb') as output_file:
+            writer.write(output_file)
                 
-        return True
+        return bytes_saved
         
     except Exception as e:
         raise Exception(f"Error filling certificate: {str(e)}")
 
 
-def generate_certificates(recipients_file, config_file, base_dir='data/certificates'):
+class CombinedCertificateWriter:
+    """
+    Writes every certificate of a run as one page of a single print-ready PDF
+    
+    The template page is written once as a Form XObject (with its fonts, images and
+    background) and the stamp fonts are written once, so each certificate only adds a
+    page dictionary and a small content stream that draws the template and the text.
+    Pages go straight to disk as they are added.
+    """
+    
+    TEMPLATE_RESOURCE = '/CertTemplate'
+    OVERLAY_RESOURCE = '/CertOverlay'
+    
+    def __init__(self, output_path, template_path, config, plan):
+        self.config = config
+        self.plan = plan
+        
+        template_page = load_template_page(template_path)
+        self.page_width = float(template_page.mediabox.width)
+        self.page_height = float(template_page.mediabox.height)
+        self.page_boxes = {NameObject('/MediaBox'): ArrayObject(template_page.mediabox)}
+        if '/CropBox' in template_page:
+            self.page_boxes[NameObject('/CropBox')] = ArrayObject(template_page.cropbox)
+        if template_page.rotation:
+            self.page_boxes[NameObject('/Rotate')] = NumberObject(template_page.rotation)
+        
+        self.pdf = StreamingPdfWriter(output_path)
+        try:
+            self.template_form = self._write_form(template_page)
+            self.shared_resources = self._write_shared_resources()
+        except Exception:
+            self.pdf.abort()
+            raise
+    
+    def _write_form(self, page):
+        """Write a page's contents and resources as a Form XObject and return its reference"""
+        contents = page.get('/Contents')
+        data = b""
+        if contents is not None:
+            contents = contents.get_object()
+            if isinstance(contents, ArrayObject):
+                data = b"\n".join(stream.get_object().get_data() for stream in contents)
+            else:
+                data = contents.get_data()
+        
+        form = _compressed_stream_object(data)
+        form[NameObject('/Type')] = NameObject('/XObject')
+        form[NameObject('/Subtype')] = NameObject('/Form')
+        form[NameObject('/BBox')] = ArrayObject(page.mediabox)
+        if '/Resources' in page:
+            form[NameObject('/Resources')] = self.pdf.import_object(page.raw_get('/Resources'))
+        return self.pdf.write_object(form)
+    
+    def _write_shared_resources(self):
+        """Write the resource dictionary shared by every directly stamped page"""
+        fonts = DictionaryObject()
+        if self.plan.direct:
+            for field in self.plan.fields:
+                if field.resource_name in fonts:
+                    continue
+                if field.font_name in STANDARD_FONTS:
+                    font = self.pdf.write_object(_standard_font_dict(field.font_name))
+                else:
+                    # Build the embedded subset in a scratch writer and copy it over once
+                    scratch_writer = PdfWriter()
+                    font = self.pdf.import_object(
+                        get_embedded_font(field.font_name).add_to_writer(scratch_writer))
+                fonts[NameObject(field.resource_name)] = font
+        
+        return self.pdf.write_object(DictionaryObject({
+            NameObject('/XObject'): DictionaryObject({
+                NameObject(self.TEMPLATE_RESOURCE): self.template_form}),
+            NameObject('/Font'): fonts,
+        }))
+    
+    def add_certificate(self, recipient_data):
+        """Append one certificate page for a recipient"""
+        text = _text_operators(self.plan, recipient_data) if self.plan.direct else None
+        
+        if text is not None:
+            content = f"q {self.TEMPLATE_RESOURCE} Do Q\n".encode('ascii') + text[0]
+            resources = self.shared_resources
+        else:
+            # Fallback: the reportlab overlay becomes this page's own Form XObject
+            overlay_buffer = create_text_overlay(self.config, recipient_data,
+                                                 self.page_width, self.page_height, self.plan)
+            overlay_form = self._write_form(PdfReader(overlay_buffer).pages[0])
+            content = (f"q {self.TEMPLATE_RESOURCE} Do Q\n"
+                       f"q {self.OVERLAY_RESOURCE} Do Q\n").encode('ascii')
+            resources = self.pdf.write_object(DictionaryObject({
+                NameObject('/XObject'): DictionaryObject({
+                    NameObject(self.TEMPLATE_RESOURCE): self.template_form,
+                    NameObject(self.OVERLAY_RESOURCE): overlay_form,
+                }),
+            }))
+        
+        page = DictionaryObject(self.page_boxes)
+        page[NameObject('/Resources')] = resources
+        page[NameObject('/Contents')] = self.pdf.write_object(_stream_object(content))
+        self.pdf.add_page(page)
+    
+    def close(self):
+        """Finish the document and move it into place"""
+        self.pdf.close()
+    
+    def abort(self):
+        """Discard the partially written document"""
+        self.pdf.abort()
+
+
+def run_fingerprint(template_path, plan):
+    """Hash the template bytes and compiled field config shared by every certificate in a run"""
+    digest = hashlib.sha256()
+    with open(template_path, 'rb') as template_file:
+        for block in iter(lambda: template_file.read(1024 * 1024), b''):
+            digest.update(block)
+    digest.update(plan.fingerprint().encode('ascii'))
+    return digest.hexdigest()
+
+
+def certificate_fingerprint(run_hash, recipient):
+    """Fingerprint one certificate's inputs: the run hash plus the recipient's name and course"""
+    payload = json.dumps([run_hash, recipient['name'], recipient['course']])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+# Recipients read from the roster and dispatched to the fill loop at a time
+RECIPIENT_CHUNK_SIZE = 1000
+
+# Configuration and render plan held by each process pool worker (set by _init_worker)
+_worker_config = None
+_worker_plan = None
+
+
+def _init_worker(template_path, config):
+    """Process pool initializer: keep the config and warm the template cache in this worker"""
+    global _worker_config, _worker_plan
+    _worker_config = config
+    _worker_plan = compile_render_plan(config)
+    load_template_page(template_path)
+
+
+def _fill_certificate_task(task):
+    """Fill one certificate inside a pool worker and return (error message or None, bytes saved)"""
+    template_path, recipient, output_path = task
+    try:
+        return None, fill_certificate(template_path, _worker_config, recipient, output_path, _worker_plan)
+    except Exception as e:
+        return str(e), 0
+
+
+def _fill_certificates_parallel(executor, tasks, workers):
+    """
+    Fill certificates across a process pool
+    
+    Yields one (error message or None, bytes saved) pair per task, in the same order as
+    tasks, so the parent process can register results deterministically.
+    """
+    chunksize = max(1, min(64, len(tasks) // (workers * 4)))
+    return executor.map(_fill_certificate_task, tasks, chunksize=chunksize)
+
+
+def _fill_certificates_sequential(config, plan, tasks):
+    """Fill certificates one by one in the current process"""
+    for template_path, recipient, output_path in tasks:
+        try:
+            yield None, fill_certificate(template_path, config, recipient, output_path, plan)
+        except Exception as e:
+            yield str(e), 0
+
+
+def _fill_certificates_combined(combined_writer, tasks):
+    """Append certificates as pages of the combined PDF"""
+    for _, recipient, _ in tasks:
+        try:
+            combined_writer.add_certificate(recipient)
+            yield None, 0
+        except Exception as e:
+            yield f"Error filling certificate: {e}", 0
+
+
+def generate_certificates(recipients_file, config_file, base_dir='data/certificates', workers=1,
+                          incremental=False, combined_output=None):
     """
     Generate personalized certificates from template PDF
     
+    Recipients are streamed from the roster in chunks of RECIPIENT_CHUNK_SIZE, so memory
+    use stays flat no matter how long the roster is. Malformed roster lines are skipped,
+    counted as 'invalid' and listed in 'errors'.
+    
     Args:
         recipients_file: Path to CSV file with recipient data
         config_file: Path to configuration JSON file
         base_dir: Base directory for certificate files
+        workers: Number of worker processes (1 = generate in the current process)
+        incremental: Skip recipients whose PDF exists and whose template, field config,
+            name and course are unchanged since it was generated (keeps their certificate ID)
+        combined_output: Write every certificate as a page of this single PDF (relative to
+            the output directory) instead of one file per recipient. Recipients already in
+            the registry keep their record and certificate ID; new ones are registered
+            without a pdf_path, with combined_pdf and combined_page pointing at their page
     
     Returns:
         dict: Summary of generation results
     """
     
+    if workers < 1:
+        raise ValueError(f"workers must be at least 1, got {workers}")
+    if combined_output and (workers > 1 or incremental):
+        raise ValueError("combined output is written by a single process and can't be used "
+                         "with workers or incremental mode")
+    
     # Make paths relative to base_dir if they're not absolute
     if not os.path.isabs(recipients_file):
         recipients_file = os.path.join(base_dir, recipients_file)
     if not os.path.isabs(config_file):
         config_file = os.path.join(base_dir, config_file)
     
-    # Load configuration and data
-    config = load_config(config_file)
-    recipients = load_recipients(recipients_file)
-    
-    if not recipients:
-        print("No valid recipients found.")
-        return {'total': 0, 'generated': 0, 'failed': 0, 'errors': []}
+    # Load configuration
+    config = load_config(config_file, base_dir)
+    if not os.path.exists(recipients_file):
+        raise FileNotFoundError(f"Recipients file not found: {recipients_file}")
     
     # Setup paths
     template_path = os.path.join(base_dir, config['template_pdf'])
@@ -228,63 +731,181 @@ def generate_certificates(recipients_file, config_file, base_dir='data/certifica
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
     
-    print(f"Loaded {len(recipients)} recipients")
+    print(f"Recipients: {recipients_file}")
     print(f"Template: {template_path}")
     print(f"Output directory: {output_dir}")
     
+    plan = compile_render_plan(config)
+    run_hash = run_fingerprint(template_path, plan)
+    
+    template_stats = load_template(template_path)[1]
+    print(f"Template optimized: {template_stats.size_before:,} -> {template_stats.size_after:,} bytes "
+          f"({template_stats.streams_compressed} streams compressed, "
+          f"{template_stats.streams_deduplicated} duplicates shared)")
+    previous_registry = get_registry() if incremental or combined_output else None
+    
+    combined_writer = None
+    if combined_output:
+        combined_path = os.path.join(output_dir, combined_output)
+        combined_writer = CombinedCertificateWriter(combined_path, template_path, config, plan)
+        print(f"Combined PDF: {combined_path}")
+    
     # Initialize counters
+    total_count = 0
     generated_count = 0
+    skipped_count = 0
     failed_count = 0
+    invalid_count = 0
+    processed_count = 0
     errors = []
     
-    for i, recipient in enumerate(recipients, 1):
-        try:
-            print(f"\n[{i}/{len(recipients)}] Processing certificate for {recipient['name']}...")
-            
-            # Generate unique certificate ID
-            certificate_id = generate_certificate_id()
-            recipient['certificate_id'] = certificate_id
-            print(f"  Generated Certificate ID: {certificate_id}")
-            
-            # Create safe filename
-            safe_name = "".join(c for c in recipient['name'] if c.isalnum() or c in (' ', '-', '_')).rstrip()
-            safe_name = safe_name.replace(' ', '_')
-            output_filename = f"{safe_name}_certificate.pdf"
-            output_path = os.path.join(output_dir, output_filename)
+    def record_invalid_line(line_num, message):
+        nonlocal invalid_count
+        invalid_count += 1
+        error_msg = f"Skipped roster line {line_num}: {message}"
+        print(f"⚠️  {error_msg}")
+        errors.append(error_msg)
+    
+    # Certificate IDs for the legacy log fallback are spooled to disk, not kept in memory
+    id_spool = tempfile.TemporaryFile('w+', encoding='utf-8')
+    
+    executor = None
+    if workers > 1:
+        print(f"Workers: {workers} processes")
+        executor = ProcessPoolExecutor(max_workers=workers,
+                                       initializer=_init_worker,
+                                       initargs=(template_path, config))
+    
+    try:
+        for chunk in iter_chunks(iter_recipients(recipients_file, on_error=record_invalid_line),
+                                 RECIPIENT_CHUNK_SIZE):
+            total_count += len(chunk)
             
-            # Fill certificate
-            fill_certificate(template_path, config, recipient, output_path)
+            # Assign certificate IDs and output paths up front so workers only stamp PDFs
+            tasks = []
+            for recipient in chunk:
+                if combined_writer is not None:
+                    # The print file is shared by everyone, so it is never a recipient's pdf_path;
+                    # recipients already registered keep their record and certificate ID
+                    existing = previous_registry and previous_registry.get_certificate(recipient['name'],
+                                                                                       recipient['course'])
+                    recipient['registered'] = existing is not None
+                    recipient['certificate_id'] = (existing['certificate_id'] if existing
+                                                   else generate_certificate_id())
+                    tasks.append((template_path, recipient, None))
+                    continue
+                
+                output_path = os.path.join(output_dir, certificate_filename(recipient['name'],
+                                                                            recipient['course']))
+                recipient['fingerprint'] = certificate_fingerprint(run_hash, recipient)
+                
+                if previous_registry is not None:
+                    existing = previous_registry.get_certificate(recipient['name'], recipient['course'])
+                    # Certificates generated before filenames included the course keep their path
+                    existing_path = existing and (existing.get('pdf_path') or output_path)
+                    if (existing and existing.get('fingerprint') == recipient['fingerprint']
+                            and os.path.exists(existing_path)):
+                        # Unchanged since last generation: keep the PDF and its certificate ID
+                        id_spool.write(f"{existing['certificate_id']} | {recipient['name']} | {recipient['course']}\n")
+                        skipped_count += 1
+                        continue
+                
+                recipient['certificate_id'] = generate_certificate_id()
+                tasks.append((template_path, recipient, output_path))
             
-            # Register certificate in central registry for data integrity
-            try:
-                registry = get_registry()
-                registry.register_certificate(
-                    name=recipient['name'],
-                    course=recipient['course'],
-                    cert_id=certificate_id,
-                    pdf_path=output_path
-                )
-                print(f"  📝 Registered in certificate registry")
-            except Exception as e:
-                print(f"  ⚠️  Warning: Could not register in certificate registry: {e}")
+            if combined_writer is not None:
+                fill_results = _fill_certificates_combined(combined_writer, tasks)
+            elif executor is not None and tasks:
+                fill_results = _fill_certificates_parallel(executor, tasks, workers)
+            else:
+                fill_results = _fill_certificates_sequential(config, plan, tasks)
             
-            generated_count += 1
-            print(f"  ✓ Certificate generated: {output_filename}")
+            # Results arrive in recipient order; the registry is only written from this process,
+            # once per chunk
+            registrations = []
+            for (_, recipient, output_path), (fill_error, bytes_saved) in zip(tasks, fill_results):
+                processed_count += 1
+                print(f"\n[{processed_count}] Processing certificate for {recipient['name']}...")
+                
+                if fill_error is not None:
+                    error_msg = f"Failed to generate certificate for {recipient['name']}: {fill_error}"
+                    print(f"  ✗ {error_msg}")
+                    errors.append(error_msg)
+                    failed_count += 1
+                    continue
+                
+                certificate_id = recipient['certificate_id']
+                generated_count += 1
+                
+                if combined_writer is not None:
+                    print(f"  ✓ Certificate added as page {generated_count} of "
+                          f"{os.path.basename(combined_path)} (ID: {certificate_id})")
+                    if not recipient['registered']:
+                        registrations.append({
+                            'name': recipient['name'],
+                            'course': recipient['course'],
+                            'cert_id': certificate_id,
+                            'combined_pdf': combined_path,
+                            'combined_page': generated_count
+                        })
+                        id_spool.write(f"{certificate_id} | {recipient['name']} | {recipient['course']}\n")
+                    continue
+                
+                print(f"  Generated Certificate ID: {certificate_id}")
+                
+                # Byte counts for the registry: as written and without output optimization
+                size_after = os.path.getsize(output_path)
+                registrations.append({
+                    'name': recipient['name'],
+                    'course': recipient['course'],
+                    'cert_id': certificate_id,
+                    'pdf_path': output_path,
+                    'fingerprint': recipient['fingerprint'],
+                    'size_before': size_after + bytes_saved,
+                    'size_after': size_after
+                })
+                
+                id_spool.write(f"{certificate_id} | {recipient['name']} | {recipient['course']}\n")
+                print(f"  ✓ Certificate generated: {os.path.basename(output_path)}")
             
-        except Exception as e:
-            error_msg = f"Failed to generate certificate for {recipient['name']}: {str(e)}"
-            print(f"  ✗ {error_msg}")
-            errors.append(error_msg)
-            failed_count += 1
-            continue
+            # Register the chunk's certificates in central registry for data integrity
+            if registrations:
+                try:
+                    get_registry().register_many(registrations)
+                except Exception as e:
+                    print(f"  ⚠️  Warning: Could not register {len(registrations)} certificates "
+                          f"in certificate registry: {e}")
+    except BaseException:
+        if combined_writer is not None:
+            combined_writer.abort()
+        raise
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    
+    if combined_writer is not None:
+        if generated_count > 0:
+            combined_writer.close()
+        else:
+            combined_writer.abort()
+    
+    if total_count == 0:
+        id_spool.close()
+        print("No valid recipients found.")
+        return {'total': 0, 'generated': 0, 'skipped': 0, 'failed': 0, 'invalid': invalid_count,
+                'errors': errors}
     
     # Print summary
     print(f"\n{'='*50}")
     print("CERTIFICATE GENERATION SUMMARY")
     print(f"{'='*50}")
-    print(f"Total recipients: {len(recipients)}")
+    print(f"Total recipients: {total_count}")
     print(f"Successfully generated: {generated_count}")
+    if incremental:
+        print(f"Unchanged (skipped): {skipped_count}")
     print(f"Failed: {failed_count}")
+    if invalid_count:
+        print(f"Invalid roster lines (skipped): {invalid_count}")
     print(f"Output directory: {output_dir}")
     
     if errors:
@@ -293,31 +914,34 @@ def generate_certificates(recipients_file, config_file, base_dir='data/certifica
             print(f"  - {error}")
     
     # Save certificate IDs to log file (for legacy compatibility)
-    if generated_count > 0:
-        log_file = os.path.join(output_dir, "certificate_ids.log")
-        try:
-            # Export from registry to maintain compatibility
-            registry = get_registry()
-            registry.export_to_legacy_log()
-            print(f"Certificate IDs logged to: {log_file}")
-        except Exception as e:
-            print(f"Warning: Could not save certificate IDs to log file: {e}")
-            
-            # Fallback to legacy method
-            import datetime
-            with open(log_file, 'a', encoding='utf-8') as f:
-                f.write(f"\n{'='*60}\n")
-                f.write(f"Certificate Generation - {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write(f"{'='*60}\n")
-                for recipient in recipients:
-                    if 'certificate_id' in recipient:
-                        f.write(f"{recipient['certificate_id']} | {recipient['name']} | {recipient['course']}\n")
-                f.write(f"{'='*60}\n")
+    with id_spool:
+        if generated_count > 0:
+            log_file = os.path.join(output_dir, "certificate_ids.log")
+            try:
+                # Export from registry to maintain compatibility
+                registry = get_registry()
+                registry.export_to_legacy_log()
+                print(f"Certificate IDs logged to: {log_file}")
+            except Exception as e:
+                print(f"Warning: Could not save certificate IDs to log file: {e}")
+                
+                # Fallback to legacy method
+                import datetime
+                id_spool.seek(0)
+                with open(log_file, 'a', encoding='utf-8') as f:
+                    f.write(f"\n{'='*60}\n")
+                    f.write(f"Certificate Generation - {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+                    f.write(f"{'='*60}\n")
+                    for line in id_spool:
+                        f.write(line)
+                    f.write(f"{'='*60}\n")
     
     return {
-        'total': len(recipients),
+        'total': total_count,
         'generated': generated_count,
+        'skipped': skipped_count,
         'failed': failed_count,
+        'invalid': invalid_count,
         'errors': errors,
         'output_directory': output_dir
     }
@@ -325,8 +949,12 @@ def generate_certificates(recipients_file, config_file, base_dir='data/certifica
 
 def fill_certificates_from_file(recipients_file='recipients.txt',
                                config_file='config.json',
-                               base_dir='data/certificates'):
+                               base_dir='data/certificates',
+                               workers=1,
+                               incremental=False,
+                               combined_output=None):
     """
     Convenience function to generate certificates using default file paths
     """
-    return generate_certificates(recipients_file, config_file, base_dir)
+    return generate_certificates(recipients_file, config_file, base_dir, workers, incremental,
+                                 combined_output)
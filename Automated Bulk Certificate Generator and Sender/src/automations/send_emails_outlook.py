@@ -1,13 +1,22 @@
-import smtplib
 import os
 import json
 import csv
-import time
 from pathlib import Path
+from types import SimpleNamespace
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.application import MIMEApplication
 
+try:
+    from ..utils.rate_limiter import RateLimiter
+    from ..utils.smtp_pool import SMTPConnection
+except ImportError:
+    # Fallback for when running as a script
+    import sys
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from utils.rate_limiter import RateLimiter
+    from utils.smtp_pool import SMTPConnection
+
 
 def load_recipients(recipients_file):
     """Load recipients from CSV file"""
@@ -100,11 +109,19 @@ def send_outlook_emails_with_attachments(recipients_file, email_body_file, confi
     failed_count = 0
     errors = []
     
+    # Reconnects and resends on its own if Outlook drops the session mid-batch, and
+    # paces sends (1 per second unless configured), slowing down when Outlook throttles
+    connection = SMTPConnection(
+        SimpleNamespace(smtp_server=config['smtp_server'], smtp_port=config['smtp_port'],
+                        email=config['sender_email'], password=config['password'], use_tls=True),
+        max_messages=config.get('max_messages_per_connection', 100),
+        send_attempts=config.get('send_attempts', 3),
+        rate_limiter=RateLimiter(config.get('messages_per_second', 1.0), config.get('burst_size', 1)))
+    
     try:
         # Connect to SMTP server
-        with smtplib.SMTP(config['smtp_server'], config['smtp_port']) as server:
-            server.starttls()
-            server.login(config['sender_email'], config['password'])
+        with connection:
+            connection.open()
             print("Successfully connected to Outlook SMTP server")
             
             for i, recipient in enumerate(recipients, 1):
@@ -137,13 +154,10 @@ def send_outlook_emails_with_attachments(recipients_file, email_body_file, confi
                         continue
                     
                     # Send the email
-                    server.send_message(msg)
+                    connection.send_message(msg)
                     sent_count += 1
                     print(f"  ✓ Email sent successfully to {recipient['email']}")
                     
-                    # Small delay to avoid overwhelming the server
-                    time.sleep(1)
-                    
                 except Exception as e:
                     error_msg = f"Failed to send to {recipient['email']}: {str(e)}"
                     print(f"  ✗ {error_msg}")
@@ -1,21 +1,26 @@
-import smtplib
 import json
 import os
 import shutil
 import csv
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.base import MIMEBase
 from email import encoders
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, Iterable, Iterator, List, Optional
 from dataclasses import dataclass
 
 # Import the certificate API integration
 try:
     from .certificate_api import push_certificate_to_web_service, get_certificate_details, fetch_certificate_for_recipient
-    from ..utils.certificate_registry import get_registry, get_certificate_fields, update_certificate_status
+    from ..utils.certificate_registry import get_registry, get_certificate_fields, get_certificate_by_id, get_recipient_certificates, update_certificate_status, update_certificate_statuses
+    from ..utils.account_router import AccountRouter
+    from ..utils.rate_limiter import RateLimiter
+    from ..utils.recipients import certificate_filename
+    from ..utils.send_scheduler import SendScheduler, format_time, is_quota_error
+    from ..utils.smtp_pool import SMTPConnectionPool
 except ImportError:
     # Fallback for when running as a script
     import sys
@@ -29,9 +34,15 @@ except ImportError:
     sys.path.insert(0, utils_dir)
     sys.path.insert(0, parent_dir)
     
+    from utils.account_router import AccountRouter
+    from utils.rate_limiter import RateLimiter
+    from utils.recipients import certificate_filename
+    from utils.send_scheduler import SendScheduler, format_time, is_quota_error
+    from utils.smtp_pool import SMTPConnectionPool
+    
     try:
         from certificate_api import push_certificate_to_web_service, get_certificate_details, fetch_certificate_for_recipient
-        from utils.certificate_registry import get_registry, get_certificate_fields, update_certificate_status
+        from utils.certificate_registry import get_registry, get_certificate_fields, get_certificate_by_id, get_recipient_certificates, update_certificate_status, update_certificate_statuses
     except ImportError as e:
         # Final fallback - import what we can and create stubs for what we can't
         try:
@@ -45,8 +56,18 @@ except ImportError:
             return None
         def get_certificate_fields(name):
             return {"name": name, "course_name": "Unknown Course", "cert_id": "Not Available"}
+        def get_certificate_by_id(cert_id):
+            return None
+        def get_recipient_certificates(name):
+            return []
         def update_certificate_status(*args, **kwargs):
             pass
+        def update_certificate_statuses(updates):
+            return 0
+
+
+# Email status updates are written to the certificate registry in batches of this size
+STATUS_BATCH_SIZE = 25
 
 
 @dataclass
@@ -57,31 +78,46 @@ class SimpleEmailConfig:
     email: str
     password: str
     use_tls: bool = True
+    pool_size: int = 4  # SMTP connections (and sending threads) used in parallel
+    max_messages_per_connection: int = 100  # Messages per session before reconnecting
+    send_attempts: int = 3  # Tries per message when the SMTP session is lost or throttled
+    messages_per_second: float = 5.0  # Highest sending rate (lowered while the server throttles)
+    burst_size: int = 10  # Messages that may go out back to back after a pause
+    daily_limit: int = 500  # Emails the account may send per rolling 24 hours (queued sending)
+    weight: Optional[float] = None  # Share of recipients among several accounts (default: messages_per_second)
 
 
 class SimpleEmailSender:
     def __init__(self, config: SimpleEmailConfig):
         self.config = config
-        self.smtp_connection = None
+        self.rate_limiter = RateLimiter(config.messages_per_second, config.burst_size)
+        self.pool = SMTPConnectionPool(config, config.pool_size, config.max_messages_per_connection,
+                                       config.send_attempts, self.rate_limiter)
     
     def connect(self):
-        """Establish SMTP connection"""
+        """Log in to the SMTP server (further pool connections open as they are needed)"""
         try:
-            self.smtp_connection = smtplib.SMTP(self.config.smtp_server, self.config.smtp_port)
-            if self.config.use_tls:
-                self.smtp_connection.starttls()
-            self.smtp_connection.login(self.config.email, self.config.password)
-            print(f"✅ Connected to SMTP server: {self.config.smtp_server}")
+            self.pool.open()
+            print(f"✅ Connected to SMTP server: {self.config.smtp_server} "
+                  f"(up to {self.pool.size} connection(s))")
             return True
         except Exception as e:
             print(f"❌ Failed to connect to SMTP server: {str(e)}")
             return False
     
     def disconnect(self):
-        """Close SMTP connection"""
-        if self.smtp_connection:
-            self.smtp_connection.quit()
-            print("📤 Disconnected from SMTP server")
+        """Close all SMTP connections"""
+        self.pool.close()
+        print("📤 Disconnected from SMTP server")
+    
+    def send_message(self, msg: MIMEMultipart):
+        """Send a message on an idle pool connection (safe to call from several threads)"""
+        self.pool.send_message(msg)
+    
+    def map(self, function: Callable, items: Iterable) -> Iterator:
+        """Run function on every item with one thread per pool connection; results in input order"""
+        with ThreadPoolExecutor(max_workers=self.pool.size) as executor:
+            yield from executor.map(function, items)
     
     def create_message(self, to_email: str, subject: str, body: str, attachments: List[str] = None) -> MIMEMultipart:
         """Create email message"""
@@ -134,23 +170,78 @@ class SimpleEmailSender:
         print(f"📎 Attachments: {len(attachments) if attachments else 0}")
         print()
         
-        for i, email in enumerate(email_list, 1):
+        def send_one(numbered_email):
+            i, email = numbered_email
             print(f"📤 Sending email {i}/{len(email_list)} to {email}...")
-            
             try:
-                msg = self.create_message(email, subject, body, attachments)
-                self.smtp_connection.send_message(msg)
-                results["sent"] += 1
-                print(f"✅ Email sent successfully")
+                self.send_message(self.create_message(email, subject, body, attachments))
+                print(f"✅ Email sent successfully to {email}")
+                return True
             except Exception as e:
+                print(f"❌ Failed to send email to {email}: {str(e)}")
+                return False
+        
+        for email, sent in zip(email_list, self.map(send_one, enumerate(email_list, 1))):
+            if sent:
+                results["sent"] += 1
+            else:
                 results["failed"] += 1
                 results["failed_emails"].append(email)
-                print(f"❌ Failed to send email: {str(e)}")
         
         self.disconnect()
         return results
 
 
+class MultiAccountSender:
+    """
+    Several sending accounts used side by side, each with its own connection pool,
+    rate and daily limit
+    
+    Recipients are spread over the accounts by weighted rendezvous hashing of their
+    address (by default in proportion to each account's messages_per_second), so a
+    recipient always gets the same account and a resend goes out from the same
+    address. All accounts send at the same time, so throughput grows with every
+    account added.
+    """
+    
+    def __init__(self, configs: List[SimpleEmailConfig]):
+        if not configs:
+            raise ValueError("At least one email account is required")
+        self.senders = {}
+        for config in configs:
+            if config.email in self.senders:
+                raise ValueError(f"Email account {config.email} is configured twice")
+            self.senders[config.email] = SimpleEmailSender(config)
+        self.router = AccountRouter({config.email: config.weight or config.messages_per_second
+                                     for config in configs})
+    
+    @property
+    def accounts(self) -> List[str]:
+        return list(self.senders)
+    
+    def connect(self) -> bool:
+        """Log in to every account; False (and nothing left open) if any of them fails"""
+        for sender in self.senders.values():
+            if not sender.connect():
+                self.disconnect()
+                return False
+        return True
+    
+    def disconnect(self):
+        for sender in self.senders.values():
+            sender.disconnect()
+    
+    def sender_for(self, email: str) -> SimpleEmailSender:
+        """The account that sends to a recipient"""
+        return self.senders[self.router.assign(email)]
+    
+    def map(self, function: Callable, items: Iterable) -> Iterator:
+        """Run function on every item with one thread per connection of all accounts; results in input order"""
+        workers = sum(sender.pool.size for sender in self.senders.values())
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            yield from executor.map(function, items)
+
+
 def auto_copy_certificates_to_attachments():
     """Automatically copy certificates from output folder to email attachments folder"""
     try:
@@ -228,17 +319,41 @@ def auto_cleanup_attachments_folder():
         return 0
 
 
-def load_simple_config(config_path: str) -> SimpleEmailConfig:
-    """Load email configuration from JSON file"""
+def load_account_configs(config_path: str) -> List[SimpleEmailConfig]:
+    """
+    Load the configuration of every sending account from a JSON file
+    
+    An "accounts" list configures several accounts; each entry's keys (at least email
+    and password) override the top-level settings, which the accounts share. Without
+    the list the file describes a single account.
+    """
     with open(config_path, 'r') as f:
         config_data = json.load(f)
     
+    shared = {key: value for key, value in config_data.items() if key != 'accounts'}
+    accounts = config_data.get('accounts') or [{}]
+    return [_config_from_dict({**shared, **account}) for account in accounts]
+
+
+def load_simple_config(config_path: str) -> SimpleEmailConfig:
+    """Load email configuration from JSON file (the first account if several are configured)"""
+    return load_account_configs(config_path)[0]
+
+
+def _config_from_dict(config_data: dict) -> SimpleEmailConfig:
     return SimpleEmailConfig(
         smtp_server=config_data['smtp_server'],
         smtp_port=config_data['smtp_port'],
         email=config_data['email'],
         password=config_data['password'],
-        use_tls=config_data.get('use_tls', True)
+        use_tls=config_data.get('use_tls', True),
+        pool_size=config_data.get('pool_size', 4),
+        max_messages_per_connection=config_data.get('max_messages_per_connection', 100),
+        send_attempts=config_data.get('send_attempts', 3),
+        messages_per_second=config_data.get('messages_per_second', 5.0),
+        burst_size=config_data.get('burst_size', 10),
+        daily_limit=config_data.get('daily_limit', 500),
+        weight=config_data.get('weight')
     )
 
 
@@ -342,21 +457,115 @@ def get_recipient_details(name: str, use_api: bool = True) -> tuple:
         return "Unknown Course", "Not Available"
 
 
+def register_in_web_service(name: str, course_name: str, cert_id: str) -> bool:
+    """
+    Push one certificate to the web validation service unless it is already there
+    
+    Returns:
+        True if the service has the certificate afterwards
+    """
+    api_registered = False
+    if cert_id != "Not Available" and course_name != "Unknown Course":
+        try:
+            print(f"🌐 Registering certificate in web validation service...")
+            
+            # The registry remembers earlier pushes; only ask the API when it doesn't
+            registry_cert = get_certificate_by_id(cert_id)
+            existing_cert = registry_cert if registry_cert and registry_cert.get('api_registered') \
+                else get_certificate_details(cert_id)
+            
+            if existing_cert:
+                print(f"✅ Certificate already exists in web service")
+                api_registered = True
+            else:
+                # Create new certificate in web service
+                api_result = push_certificate_to_web_service(
+                    cert_id=cert_id,
+                    recipient_name=name,
+                    course_name=course_name
+                )
+                
+                if api_result.get('success'):
+                    print(f"✅ Certificate registered for web verification")
+                    api_registered = True
+                elif api_result.get('skipped'):
+                    print(f"ℹ️  API integration disabled")
+                else:
+                    print(f"⚠️  Web service registration failed: {api_result.get('message', 'Unknown error')}")
+                    
+        except Exception as api_error:
+            print(f"⚠️  Web service registration error: {str(api_error)}")
+            # Continue with email sending even if API fails
+    
+    return api_registered
+
+
+def find_registry_certificates(name: str, certificate_files: dict) -> list:
+    """
+    Get every registered certificate for a recipient whose PDF is available
+    
+    Only a file named for that one certificate (certificate_filename() of the name and
+    course, or of the name alone for older runs) is attached, so a shared file such as
+    a combined print PDF is never sent to a recipient.
+    
+    Returns:
+        (certificate record, PDF path) pairs, oldest certificate first
+    """
+    earned = []
+    for cert in get_recipient_certificates(name):
+        pdf_path = cert.get('pdf_path')
+        if not pdf_path:
+            continue
+        own_stems = {Path(certificate_filename(cert['name'], cert['course'])).stem,
+                     Path(certificate_filename(cert['name'])).stem}
+        if Path(pdf_path).stem not in own_stems:
+            continue
+        # Prefer the copy in the certificates folder, else the generated file itself
+        certificate_path = certificate_files.get(Path(pdf_path).stem)
+        if certificate_path is None and os.path.exists(pdf_path):
+            certificate_path = pdf_path
+        if certificate_path is not None:
+            earned.append((cert, certificate_path))
+    return earned
+
+
+def flush_status_updates(status_updates: list):
+    """Write queued (name, course, fields) certificate status updates to the registry in one batch"""
+    if not status_updates:
+        return
+    try:
+        update_certificate_statuses(status_updates)
+    except Exception as e:
+        print(f"⚠️  Warning: Could not update certificate status: {e}")
+    status_updates.clear()
+
+
 def send_personalized_emails_with_certificates(
     email_list_file: str,
     subject: str,
     body_template: str,
     config_file: str,
-    certificates_dir: str
+    certificates_dir: str,
+    queue_file: Optional[str] = None,
+    daily_limit: Optional[int] = None
 ) -> dict:
-    """Send personalized emails with individual certificate attachments"""
+    """
+    Send personalized emails with individual certificate attachments
+    
+    Recipients are shared out over every account in the config (see MultiAccountSender).
+    With a queue_file, every recipient is queued there first and sent within each
+    account's daily limit (daily_limit for all of them, else each account's own),
+    waiting for the next 24-hour window when it is used up. Running the same job
+    again resumes the queue.
+    """
+    status_updates = []
     try:
         # Automatically copy certificates from output folder to attachments folder
         print("🔄 Auto-copying certificates from output folder...")
         auto_copy_certificates_to_attachments()
         
         # Load configuration
-        config = load_simple_config(config_file)
+        configs = load_account_configs(config_file)
         
         # Parse email list with names and emails (CSV format)
         recipients = []
@@ -394,100 +603,155 @@ def send_personalized_emails_with_certificates(
         # Initialize results
         results = {"sent": 0, "failed": 0, "total": len(recipients), "failed_emails": [], "missing_certificates": []}
         
-        # Connect to SMTP
-        sender = SimpleEmailSender(config)
-        if not sender.connect():
-            return results
-        
-        print(f"📤 Sending personalized emails...")
-        print()
+        sender = MultiAccountSender(configs)
+        if len(configs) > 1:
+            print(f"👥 Sharing recipients over {len(configs)} accounts: {', '.join(sender.accounts)}")
         
-        for i, recipient in enumerate(recipients, 1):
+        def send_one(numbered_recipient):
+            """Send one recipient's email on a pool thread; returns (error or None, certificate missing, status updates)"""
+            i, recipient = numbered_recipient
             name = recipient['name']
             email = recipient['email']
             
-            print(f"📧 Processing {i}/{len(recipients)}: {name} ({email})")
+            print(f"📧 Processing {i}/{results['total']}: {name} ({email})")
             
+            missing_certificate = False
             try:
-                # Find matching certificate
-                certificate_path = find_matching_certificate(name, certificate_files)
+                # Every certificate the registry holds for this person, with its PDF
+                earned = find_registry_certificates(name, certificate_files)
                 
-                if not certificate_path:
-                    print(f"⚠️  No matching certificate found for {name}")
-                    results["missing_certificates"].append(name)
-                    # Still send email without certificate
-                    attachments = []
-                    course_name = "Unknown Course"
-                    cert_id = "Not Available"
+                if earned:
+                    attachments = [certificate_path for _, certificate_path in earned]
+                    for _, certificate_path in earned:
+                        print(f"📎 Found certificate: {Path(certificate_path).name}")
+                    certificates = [(cert['course'], cert['certificate_id']) for cert, _ in earned]
                 else:
-                    print(f"📎 Found certificate: {Path(certificate_path).name}")
-                    attachments = [certificate_path]
+                    # Not in the registry: match a certificate file by name
+                    certificate_path = find_matching_certificate(name, certificate_files)
                     
-                    # Get course name and certificate ID for this recipient
-                    course_name, cert_id = get_recipient_details(name)
+                    if not certificate_path:
+                        print(f"⚠️  No matching certificate found for {name}")
+                        missing_certificate = True
+                        # Still send email without certificate
+                        attachments = []
+                        certificates = [("Unknown Course", "Not Available")]
+                    else:
+                        print(f"📎 Found certificate: {Path(certificate_path).name}")
+                        attachments = [certificate_path]
+                        
+                        # Get course name and certificate ID for this recipient
+                        certificates = [get_recipient_details(name)]
                 
                 # Personalize email body with name, course_name, and cert_id
+                # (several certificates are listed comma-separated)
                 personalized_body = body_template.format(
                     name=name, 
-                    course_name=course_name, 
-                    cert_id=cert_id
+                    course_name=", ".join(course_name for course_name, _ in certificates), 
+                    cert_id=", ".join(cert_id for _, cert_id in certificates)
                 )
                 
                 # Push certificate data to web validation service (if cert_id is available and not already in API)
-                if cert_id != "Not Available" and course_name != "Unknown Course":
-                    try:
-                        print(f"🌐 Registering certificate in web validation service...")
-                        
-                        # Try to get existing certificate first to avoid duplicates
-                        existing_cert = get_certificate_details(cert_id)
-                        
-                        if existing_cert:
-                            print(f"✅ Certificate already exists in web service")
-                        else:
-                            # Create new certificate in web service
-                            api_result = push_certificate_to_web_service(
-                                cert_id=cert_id,
-                                recipient_name=name,
-                                course_name=course_name
-                            )
-                            
-                            if api_result.get('success'):
-                                print(f"✅ Certificate registered for web verification")
-                            elif api_result.get('skipped'):
-                                print(f"ℹ️  API integration disabled")
-                            else:
-                                print(f"⚠️  Web service registration failed: {api_result.get('message', 'Unknown error')}")
-                                
-                    except Exception as api_error:
-                        print(f"⚠️  Web service registration error: {str(api_error)}")
-                        # Continue with email sending even if API fails
+                api_registered = {course_name: register_in_web_service(name, course_name, cert_id)
+                                  for course_name, cert_id in certificates}
                 
-                # Create and send email
-                msg = sender.create_message(email, subject, personalized_body, attachments)
-                sender.smtp_connection.send_message(msg)
+                # Create and send email from the recipient's account
+                account_sender = sender.sender_for(email)
+                msg = account_sender.create_message(email, subject, personalized_body, attachments)
+                account_sender.send_message(msg)
                 
-                # Update certificate status in registry
-                try:
-                    update_certificate_status(
-                        name=name,
-                        email_sent=True,
-                        api_registered=(cert_id != "Not Available"),
-                        email_timestamp=datetime.now().isoformat()
-                    )
-                except Exception as e:
-                    print(f"⚠️  Warning: Could not update certificate status: {e}")
+                # Certificate status updates for the registry
+                email_timestamp = datetime.now().isoformat()
+                updates = [(name, course_name, {
+                    "email_sent": True,
+                    "api_registered": registered,
+                    "email_timestamp": email_timestamp
+                }) for course_name, registered in api_registered.items()]
                 
-                results["sent"] += 1
-                print(f"✅ Email sent successfully")
+                print(f"✅ Email sent successfully to {email}")
+                return None, missing_certificate, updates
                 
             except Exception as e:
+                print(f"❌ Failed to send email to {email}: {str(e)}")
+                return e, missing_certificate, []
+        
+        def record_result(recipient, sent, missing_certificate, updates):
+            if missing_certificate:
+                results["missing_certificates"].append(recipient['name'])
+            if sent:
+                results["sent"] += 1
+                status_updates.extend(updates)
+                if len(status_updates) >= STATUS_BATCH_SIZE:
+                    flush_status_updates(status_updates)
+            else:
                 results["failed"] += 1
-                results["failed_emails"].append(email)
-                print(f"❌ Failed to send email: {str(e)}")
+                results["failed_emails"].append(recipient['email'])
+        
+        if queue_file is None:
+            # Connect to SMTP
+            if not sender.connect():
+                return results
             
+            print(f"📤 Sending personalized emails...")
             print()
-        
-        sender.disconnect()
+            
+            # Recipients are sent in parallel; results are collected here in list order
+            for recipient, (error, missing_certificate, updates) in zip(
+                    recipients, sender.map(send_one, enumerate(recipients, 1))):
+                record_result(recipient, error is None, missing_certificate, updates)
+            
+            print()
+            flush_status_updates(status_updates)
+            sender.disconnect()
+        else:
+            account_limits = {config.email: daily_limit or config.daily_limit for config in configs}
+            with SendScheduler(queue_file, daily_limit or configs[0].daily_limit,
+                               account_limits=account_limits) as scheduler:
+                job = {"email_list": email_list_file, "subject": subject}
+                if scheduler.enqueue(recipients, job) == 0:
+                    print(f"📋 Resuming {len(scheduler.queue)} emails queued by an earlier run")
+                results["total"] = len(scheduler.queue)
+                
+                # Recipients keep the account they were queued for, as long as it is still configured
+                for recipient in scheduler.queue.values():
+                    if recipient.get('account') in sender.senders:
+                        sender.router.pin(recipient['email'], recipient['account'])
+                    else:
+                        recipient['account'] = sender.router.assign(recipient['email'])
+                
+                for account in sender.accounts:
+                    print(f"🗓️  Daily limit for {account}: {scheduler.limit(account)} emails per 24 hours")
+                    for start, count in scheduler.plan(account):
+                        print(f"   {count} emails from {format_time(start)}")
+                
+                done = 0
+                for batch in scheduler.batches(sender.accounts):
+                    if not sender.connect():
+                        break
+                    print(f"📤 Sending {len(batch)} queued emails...")
+                    print()
+                    
+                    numbered = [(done + n, recipient) for n, (_, recipient) in enumerate(batch, 1)]
+                    for (entry_id, recipient), (error, missing_certificate, updates) in zip(
+                            batch, sender.map(send_one, numbered)):
+                        if error is not None and is_quota_error(error):
+                            # Stays queued for the next window
+                            scheduler.record_quota_exceeded(recipient['account'])
+                            continue
+                        if error is None:
+                            scheduler.record_sent(recipient['account'], entry_id)
+                        else:
+                            scheduler.record_failed(entry_id)
+                        record_result(recipient, error is None, missing_certificate, updates)
+                        done += 1
+                        if done % STATUS_BATCH_SIZE == 0:
+                            scheduler.save()
+                    
+                    print()
+                    flush_status_updates(status_updates)
+                    scheduler.save()
+                    sender.disconnect()
+                
+                results["queued"] = len(scheduler.queue)
         
         # Print summary
         print("📊 Email Sending Summary:")
@@ -507,14 +771,18 @@ def send_personalized_emails_with_certificates(
             for name in results['missing_certificates']:
                 print(f"  - {name}")
         
+        if results.get('queued'):
+            print(f"\n📋 {results['queued']} emails are still queued; run the same command again to send them")
+        
         # Auto-cleanup attachments folder if all emails were sent successfully
-        if results['sent'] > 0 and results['failed'] == 0:
+        if results['sent'] > 0 and results['failed'] == 0 and not results.get('queued'):
             print()  # Add blank line before cleanup message
             auto_cleanup_attachments_folder()
         
         return results
         
     except Exception as e:
+        flush_status_updates(status_updates)
         print(f"❌ Error in email sending: {str(e)}")
         return {"sent": 0, "failed": 0, "total": 0, "failed_emails": []}
 
@@ -556,7 +824,9 @@ def send_from_file(
     subject: str, 
     body_file: str,
     config_file: str,
-    attachments_dir: str
+    attachments_dir: str,
+    queue_file: Optional[str] = None,
+    daily_limit: Optional[int] = None
 ) -> dict:
     """Send personalized emails from files with individual certificate attachments"""
     try:
@@ -570,7 +840,9 @@ def send_from_file(
             subject=subject,
             body_template=body_template,
             config_file=config_file,
-            certificates_dir=attachments_dir
+            certificates_dir=attachments_dir,
+            queue_file=queue_file,
+            daily_limit=daily_limit
         )
         
     except Exception as e:
@@ -33,6 +33,11 @@ def main():
                               help='Text file containing email body (default: data/emails/email.txt)')
     emails_parser.add_argument('--config', '-c', type=str, default='data/emails/email_config.json',
                               help='Email configuration JSON file (default: data/emails/email_config.json)')
+    emails_parser.add_argument('--queue', action='store_true',
+                              help='Queue every email in data/emails/send_queue.json and send within the daily limit, '
+                                   'waiting for the next 24-hour window when it is reached (rerun to resume)')
+    emails_parser.add_argument('--daily-limit', type=int, default=None,
+                              help='Emails each account may send per 24 hours with --queue (default: its daily_limit in the config, else 500)')
 
     # Send Outlook Emails with Attachments Parser
     outlook_parser = subparsers.add_parser('send_outlook_emails', help='Send personalized emails with individual attachments via Outlook')
@@ -53,6 +58,29 @@ def main():
                              help='Certificate configuration JSON file (default: data/certificates/config.json)')
     certs_parser.add_argument('--base-dir', '-d', type=str, default='data/certificates',
                              help='Base directory for certificate files (default: data/certificates)')
+    certs_parser.add_argument('--workers', '-w', type=int, default=1,
+                             help='Number of worker processes for parallel generation (default: 1)')
+    certs_parser.add_argument('--incremental', action='store_true',
+                             help='Only regenerate certificates whose template, config, name or course changed')
+    certs_parser.add_argument('--combined', type=str, metavar='FILE',
+                             help='Write all certificates as pages of one print-ready PDF in the output directory')
+
+    # Certificate Registry Maintenance Parser
+    registry_parser = subparsers.add_parser('registry', help='Maintain the certificate registry')
+    registry_parser.add_argument('--base-dir', '-d', type=str, default='data/certificates',
+                                help='Base directory for certificate files (default: data/certificates)')
+    registry_parser.add_argument('--migrate-sqlite', action='store_true',
+                                help='Copy certificate_registry.json into certificate_registry.db and use SQLite from now on')
+    registry_parser.add_argument('--export-json', type=str, metavar='FILE',
+                                help='Export the registry as certificate_registry.json-format JSON')
+    registry_parser.add_argument('--compact-log', action='store_true',
+                                help='Rewrite output/certificate_ids.log from the registry (one line per certificate)')
+    registry_parser.add_argument('--verify', type=str, metavar='CERT_ID',
+                                help='Look up a certificate ID and show who it was issued to')
+    registry_parser.add_argument('--pending', type=str, choices=['pdf', 'email', 'api'],
+                                help='List certificates still waiting for a PDF, an email or an API push')
+    registry_parser.add_argument('--limit', type=int, default=None,
+                                help='Maximum number of certificates to list with --pending (default: all)')
 
     # Add more automation parsers here as needed
 
@@ -84,7 +112,9 @@ def main():
             from automations.send_same_email import send_from_file
             
             # Run the simple email automation
-            results = send_from_file(args.emails, args.subject, args.body, args.config, 'data/emails/attachments')
+            queue_file = 'data/emails/send_queue.json' if args.queue else None
+            results = send_from_file(args.emails, args.subject, args.body, args.config, 'data/emails/attachments',
+                                     queue_file, args.daily_limit)
             
             if results['total'] == 0:
                 sys.exit(1)
@@ -104,13 +134,48 @@ def main():
             from automations.fill_certificates import fill_certificates_from_file
             
             # Run the certificate filling automation
-            results = fill_certificates_from_file(args.recipients, args.config, args.base_dir)
+            results = fill_certificates_from_file(args.recipients, args.config, args.base_dir,
+                                                  args.workers, args.incremental, args.combined)
             
             print(f"\nCompleted: {results['generated']}/{results['total']} certificates generated successfully")
-            if results['failed'] > 0:
-                print(f"Failed: {results['failed']} certificates")
+            if results['skipped'] > 0:
+                print(f"Unchanged: {results['skipped']} certificates skipped")
+            if results['invalid'] > 0:
+                print(f"Invalid: {results['invalid']} roster lines skipped")
+            if results['failed'] > 0 or results['invalid'] > 0:
+                if results['failed'] > 0:
+                    print(f"Failed: {results['failed']} certificates")
                 sys.exit(1)
 
+        elif args.automation == 'registry':
+            from utils.certificate_registry import CertificateRegistry
+            
+            if args.migrate_sqlite:
+                registry = CertificateRegistry(args.base_dir, backend='json')
+                registry.migrate_to_sqlite()
+            registry = CertificateRegistry(args.base_dir)
+            if args.export_json:
+                registry.export_json(args.export_json)
+                print(f"Exported {len(registry.get_all_certificates())} certificates to {args.export_json}")
+            if args.compact_log:
+                registry.compact_legacy_log()
+            if args.verify:
+                record = registry.verify_certificate(args.verify)
+                if record is None:
+                    print(f"❌ Certificate {args.verify} is not in the registry")
+                    sys.exit(1)
+                print(f"✅ Certificate {record['certificate_id']}: {record['name']} - {record['course']} "
+                      f"(issued {record['issue_date']}, valid until {record['expiry_date']})")
+            elif args.pending:
+                for record in registry.pending(args.pending, args.limit):
+                    print(f"{record['certificate_id']} | {record['name']} | {record['course']}")
+            else:
+                counts = registry.status_counts()
+                print(f"Registry backend: {registry.backend}")
+                print(f"Certificates: {counts['total']} "
+                      f"(PDF generated: {counts['pdf_generated']}, emailed: {counts['email_sent']}, "
+                      f"pushed to API: {counts['api_registered']})")
+
     except Exception as e:
         print(f"Error: {str(e)}")
         sys.exit(1)
@@ -0,0 +1,68 @@
+"""
+Account Router Module
+Spreads recipients over several sending accounts in proportion to their weights, always
+giving a recipient the same account
+"""
+
+import hashlib
+import math
+import threading
+from typing import Dict
+
+
+class AccountRouter:
+    """
+    Weighted rendezvous (highest random weight) hashing
+    
+    Every account scores each recipient with a hash of the account and the normalized
+    email address, scaled by the account's weight, and the highest score wins. Accounts
+    get recipients in proportion to their weights, and the choice depends only on the
+    address and the configured accounts, not on list order or earlier runs: retries and
+    reruns for failed recipients send from the same address. Adding or removing an
+    account only moves the recipients that go to or came from that account.
+    
+    Usage:
+        router = AccountRouter({"a@example.com": 5, "b@example.com": 2.5})
+        account = router.assign("student@example.org")
+    """
+    
+    def __init__(self, weights: Dict[str, float]):
+        """
+        Args:
+            weights: Account name to its share of recipients (e.g. its messages per second)
+        """
+        if not weights:
+            raise ValueError("At least one account is required")
+        for account, weight in weights.items():
+            if weight <= 0:
+                raise ValueError(f"Weight of {account} must be positive, got {weight}")
+        
+        self.weights = dict(weights)
+        self._pinned: Dict[str, str] = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _normalize(recipient: str) -> str:
+        return recipient.strip().lower()
+    
+    def _score(self, account: str, key: str) -> float:
+        digest = hashlib.sha256(f"{account}\0{key}".encode('utf-8')).digest()
+        # Uniform in (0, 1); -weight / ln(u) makes the winning odds proportional to weight
+        uniform = (int.from_bytes(digest[:8], 'big') + 0.5) / 2 ** 64
+        return -self.weights[account] / math.log(uniform)
+    
+    def assign(self, recipient: str) -> str:
+        """Account for a recipient: the one it was pinned to, else its highest scoring account"""
+        key = self._normalize(recipient)
+        with self._lock:
+            account = self._pinned.get(key)
+        if account is not None:
+            return account
+        return max(self.weights, key=lambda account: self._score(account, key))
+    
+    def pin(self, recipient: str, account: str):
+        """Keep a recipient on a known account (e.g. one given in an earlier run)"""
+        if account not in self.weights:
+            raise ValueError(f"Unknown account: {account}")
+        with self._lock:
+            self._pinned[self._normalize(recipient)] = account
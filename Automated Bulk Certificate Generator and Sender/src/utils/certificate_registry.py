@@ -4,12 +4,38 @@ Ensures data integrity between certificate generation, email sending, and API in
 """
 
 import os
-import json
 import csv
+import hashlib
+import threading
+import atexit
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from pathlib import Path
 
+try:
+    from .recipients import iter_recipients
+    from .registry_store import STATUS_FLAGS, JsonJournalStore, SQLiteStore, migrate_json_to_sqlite
+except ImportError:
+    # Fallback for when utils is on sys.path directly
+    from recipients import iter_recipients
+    from registry_store import STATUS_FLAGS, JsonJournalStore, SQLiteStore, migrate_json_to_sqlite
+
+
+# Registry storage backends: "json" (snapshot + journal) or "sqlite"
+REGISTRY_BACKENDS = ("json", "sqlite")
+
+# Record key format: 1 = normalized name, 2 = "name|course" (one record per course)
+KEY_FORMAT = 2
+
+# Fields accepted by register_many() entries (the register_certificate() arguments)
+REQUIRED_CERTIFICATE_FIELDS = ("name", "course", "cert_id")
+OPTIONAL_CERTIFICATE_FIELDS = ("issue_date", "expiry_date", "pdf_path", "fingerprint",
+                               "size_before", "size_after", "combined_pdf", "combined_page")
+
+# Bytes at each end of the imported part of certificate_ids.log hashed into the sync
+# watermark, to notice the log being rewritten or replaced
+LEGACY_LOG_HASH_BYTES = 4096
+
 
 class CertificateRegistry:
     """
@@ -17,47 +43,124 @@ class CertificateRegistry:
     between PDF generation, email templates, and API requests
     """
     
-    def __init__(self, base_dir: str = "data/certificates"):
+    def __init__(self, base_dir: str = "data/certificates", backend: str = None):
+        """
+        Args:
+            base_dir: Directory holding the registry, recipients.txt and output/
+            backend: "json" or "sqlite" (default: $CERTIFICATE_REGISTRY_BACKEND, else
+                "sqlite" if certificate_registry.db exists, else "json")
+        """
         self.base_dir = base_dir
         self.registry_file = os.path.join(base_dir, "certificate_registry.json")
+        self.journal_file = os.path.join(base_dir, "certificate_registry.journal")
+        self.db_file = os.path.join(base_dir, "certificate_registry.db")
         self.recipients_file = os.path.join(base_dir, "recipients.txt")
         self.output_dir = os.path.join(base_dir, "output")
         
         # Ensure directories exist
         os.makedirs(self.output_dir, exist_ok=True)
         
-        # Load or initialize registry
-        self.registry = self._load_registry()
+        self.backend = backend = _resolve_backend(backend, self.db_file)
+        
+        if backend == "sqlite":
+            # First switch to SQLite: bring the existing JSON registry along
+            if not os.path.exists(self.db_file) and (os.path.exists(self.registry_file)
+                                                     or os.path.exists(self.journal_file)):
+                self.migrate_to_sqlite()
+            self._store = SQLiteStore(self.db_file)
+        else:
+            # Load registry: JSON snapshot plus the journal of changes made since
+            self._store = JsonJournalStore(self.registry_file, self.journal_file)
+        
+        if self._store.metadata.get("key_format", 1) < KEY_FORMAT:
+            self._rekey()
     
-    def _load_registry(self) -> Dict:
-        """Load certificate registry from JSON file"""
-        if os.path.exists(self.registry_file):
-            try:
-                with open(self.registry_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"⚠️  Warning: Could not load registry: {e}")
+    @staticmethod
+    def record_key(name: str, course: str) -> str:
+        """
+        Registry key for a certificate: normalized name and course
         
-        return {
-            "certificates": {},
-            "metadata": {
-                "created": datetime.now().isoformat(),
-                "last_updated": datetime.now().isoformat(),
-                "version": "1.0"
-            }
-        }
+        "|" separates the two because it can't occur in a name or course (it is the
+        certificate_ids.log field separator).
+        """
+        return f"{name.strip().lower()}|{course.strip().lower()}"
     
-    def _save_registry(self):
-        """Save certificate registry to JSON file"""
-        self.registry["metadata"]["last_updated"] = datetime.now().isoformat()
-        try:
-            with open(self.registry_file, 'w', encoding='utf-8') as f:
-                json.dump(self.registry, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            print(f"⚠️  Warning: Could not save registry: {e}")
+    def _rekey(self):
+        """Move records stored under name-only keys to name|course keys"""
+        moved = [(key, self.record_key(record.get("name", ""), record.get("course", "")), record)
+                 for key, record in self._store.items()]
+        moved = [item for item in moved if item[0] != item[1]]
+        with self._store.batch():
+            if moved:
+                self._store.delete_many(old_key for old_key, _, _ in moved)
+                self._store.put_many((new_key, record) for _, new_key, record in moved)
+            self._store.set_metadata(key_format=KEY_FORMAT)
+        if moved:
+            print(f"🔑 Re-keyed {len(moved)} registry records by name and course")
+    
+    def migrate_to_sqlite(self) -> int:
+        """
+        One-shot migration of certificate_registry.json (and its journal) into
+        certificate_registry.db
+        
+        The JSON files are kept as a backup. Once the database exists it is used by
+        default, so run this while nothing else is writing to the registry.
+        
+        Returns:
+            Number of certificates migrated
+        
+        Raises:
+            FileExistsError: If certificate_registry.db already exists
+        """
+        if os.path.exists(self.db_file):
+            raise FileExistsError(f"SQLite registry already exists: {self.db_file}")
+        count = migrate_json_to_sqlite(self.registry_file, self.journal_file, self.db_file)
+        print(f"🗄️  Migrated {count} certificates to SQLite registry: {self.db_file}")
+        return count
+    
+    def batch(self):
+        """
+        Group registry writes into one transaction (a single journal write or SQLite commit)
+        
+        Usage:
+            with registry.batch():
+                registry.register_certificate(...)
+        """
+        return self._store.batch()
+    
+    def refresh(self):
+        """Pick up changes other processes made to the registry since it was last read"""
+        self._store.refresh()
+    
+    def compact(self):
+        """Fold the change journal into certificate_registry.json (SQLite: checkpoint the WAL)"""
+        self._store.compact()
+    
+    def close(self):
+        """
+        Finish using the registry: with the JSON backend the journal is folded into
+        certificate_registry.json, with SQLite the database connection is closed
+        """
+        self._store.close()
+    
+    def export_json(self, path: str = None):
+        """
+        Export the full registry as indented JSON (the certificate_registry.json format)
+        
+        Args:
+            path: Output file (default: certificate_registry.json itself; with the JSON
+                backend this compacts the journal into it)
+        """
+        if path is None and self.backend == "json":
+            self.compact()
+        else:
+            self._store.export_json(path or self.registry_file)
     
     def register_certificate(self, name: str, course: str, cert_id: str, 
-                           issue_date: str = None, expiry_date: str = None, pdf_path: str = None) -> Dict:
+                           issue_date: str = None, expiry_date: str = None, pdf_path: str = None,
+                           fingerprint: str = None, size_before: int = None,
+                           size_after: int = None, combined_pdf: str = None,
+                           combined_page: int = None) -> Dict:
         """
         Register a certificate with guaranteed data integrity
         
@@ -68,10 +171,85 @@ class CertificateRegistry:
             issue_date: Issue date in YYYY-MM-DD format
             expiry_date: Expiry date in YYYY-MM-DD format (auto-calculated if not provided)
             pdf_path: Path to generated PDF file
+            fingerprint: Hash of the inputs the PDF was generated from (for incremental runs)
+            size_before: PDF size in bytes without output optimization
+            size_after: PDF size in bytes as written
+            combined_pdf: Combined print PDF holding the certificate (not an attachment)
+            combined_page: 1-based page of the certificate in combined_pdf
             
         Returns:
             Certificate record dictionary
         """
+        lookup_key, cert_record = self._build_record(name, course, cert_id, issue_date, expiry_date,
+                                                     pdf_path, fingerprint, size_before, size_after,
+                                                     combined_pdf, combined_page)
+        
+        # Store in registry
+        self._put_records([(lookup_key, cert_record)])
+        
+        print(f"📝 Registered certificate: {cert_id} for {name} (valid until {cert_record['expiry_date']})")
+        return cert_record
+    
+    def register_many(self, certificates: Iterable[Dict]) -> List[Dict]:
+        """
+        Register many certificates with a single registry write
+        
+        Every entry is validated before anything is stored, so an invalid entry leaves
+        the registry unchanged. The records are then written in one journal append
+        (JSON backend) or one transaction (SQLite backend).
+        
+        Args:
+            certificates: Dictionaries with the register_certificate() arguments:
+                name, course and cert_id, plus optionally issue_date, expiry_date,
+                pdf_path, fingerprint, size_before, size_after, combined_pdf and
+                combined_page
+            
+        Returns:
+            Certificate records, in input order
+        
+        Raises:
+            ValueError: If an entry is missing a required field, has an unknown field
+                or has a date not in YYYY-MM-DD format
+        """
+        allowed = set(REQUIRED_CERTIFICATE_FIELDS + OPTIONAL_CERTIFICATE_FIELDS)
+        items = []
+        for index, entry in enumerate(certificates):
+            unknown = sorted(set(entry) - allowed)
+            if unknown:
+                raise ValueError(f"Certificate entry {index}: unknown field(s) {', '.join(unknown)}")
+            for field in REQUIRED_CERTIFICATE_FIELDS:
+                value = entry.get(field)
+                if not isinstance(value, str) or not value.strip():
+                    raise ValueError(f"Certificate entry {index}: '{field}' must be a non-empty string")
+            for field in ("issue_date", "expiry_date"):
+                if entry.get(field) is not None:
+                    try:
+                        datetime.strptime(entry[field], '%Y-%m-%d')
+                    except (TypeError, ValueError):
+                        raise ValueError(f"Certificate entry {index}: '{field}' must be in YYYY-MM-DD "
+                                         f"format, got {entry[field]!r}")
+            items.append(self._build_record(**entry))
+        
+        if items:
+            self._put_records(items)
+            print(f"📝 Registered {len(items)} certificates")
+        return [cert_record for _, cert_record in items]
+    
+    def _put_records(self, items: List[Tuple[str, Dict]]):
+        """Store new records, numbering them in registration order (registry_seq)"""
+        with self._store.batch():
+            registry_seq = self._store.metadata.get("registry_seq", 0)
+            for _, cert_record in items:
+                registry_seq += 1
+                cert_record["registry_seq"] = registry_seq
+            self._store.put_many(items)
+            self._store.set_metadata(registry_seq=registry_seq)
+    
+    def _build_record(self, name: str, course: str, cert_id: str, issue_date: str = None,
+                      expiry_date: str = None, pdf_path: str = None, fingerprint: str = None,
+                      size_before: int = None, size_after: int = None, combined_pdf: str = None,
+                      combined_page: int = None) -> Tuple[str, Dict]:
+        """Create the lookup key and record for a new certificate"""
         if issue_date is None:
             issue_date = datetime.now().strftime('%Y-%m-%d')
             
@@ -88,7 +266,7 @@ class CertificateRegistry:
                 expiry_date = expiry_date_obj.strftime('%Y-%m-%d')
         
         # Create normalized key for lookup (case-insensitive, trimmed)
-        lookup_key = name.strip().lower()
+        lookup_key = self.record_key(name, course)
         
         # Create the certificate record
         cert_record = {
@@ -100,50 +278,151 @@ class CertificateRegistry:
             "registration_timestamp": datetime.now().isoformat(),
             "pdf_generated": pdf_path is not None,
             "pdf_path": pdf_path,
+            "fingerprint": fingerprint,
+            "pdf_size_before": size_before,
+            "pdf_size_after": size_after,
+            "combined_pdf": combined_pdf,
+            "combined_page": combined_page,
             "email_sent": False,
             "api_registered": False
         }
-        
-        # Store in registry
-        self.registry["certificates"][lookup_key] = cert_record
-        self._save_registry()
-        
-        print(f"📝 Registered certificate: {cert_id} for {name} (valid until {expiry_date})")
-        return cert_record
+        return lookup_key, cert_record
     
-    def get_certificate(self, name: str) -> Optional[Dict]:
+    def get_certificate(self, name: str, course: str = None) -> Optional[Dict]:
         """
         Get certificate record by recipient name with exact data integrity
         
         Args:
             name: Recipient name (case-insensitive lookup)
+            course: Course name (case-insensitive); if omitted, the recipient's most
+                recently registered certificate is returned
             
         Returns:
             Certificate record with exact field values or None
         """
-        lookup_key = name.strip().lower()
-        return self.registry["certificates"].get(lookup_key)
+        if course is not None:
+            return self._store.get(self.record_key(name, course))
+        
+        certificates = self.get_certificates(name)
+        return certificates[-1] if certificates else None
+    
+    def get_certificates(self, name: str) -> List[Dict]:
+        """
+        Get every certificate registered for a recipient (indexed by name)
+        
+        Args:
+            name: Recipient name (case-insensitive lookup)
+            
+        Returns:
+            Certificate records, oldest registration first
+        """
+        return self._store.get_by_name(name.strip().lower())
+    
+    def get_by_certificate_id(self, cert_id: str) -> Optional[Dict]:
+        """
+        Get certificate record by certificate ID (indexed lookup, no scan)
+        
+        Args:
+            cert_id: Certificate ID exactly as embedded in the PDF
+            
+        Returns:
+            Certificate record or None
+        """
+        return self._store.get_by_certificate_id(cert_id.strip())
+    
+    def verify_certificate(self, cert_id: str, name: str = None) -> Optional[Dict]:
+        """
+        Check that a certificate ID was issued by this registry
+        
+        Args:
+            cert_id: Certificate ID to verify
+            name: If given, the recipient the certificate must belong to (case-insensitive)
+            
+        Returns:
+            Certificate record if the ID is registered (to that recipient), else None
+        """
+        cert_record = self.get_by_certificate_id(cert_id)
+        if cert_record is None:
+            return None
+        if name is not None and cert_record["name"].strip().lower() != name.strip().lower():
+            return None
+        return cert_record
+    
+    def status_counts(self) -> Dict[str, int]:
+        """
+        Certificate counts by status, maintained on every change (no scan)
+        
+        Returns:
+            Dictionary with total, pdf_generated, email_sent and api_registered, plus
+            pending_pdf, pending_email and pending_api (total minus the matching count)
+        """
+        return _with_pending_counts(self._store.status_counts())
+    
+    def pending(self, kind: str, limit: int = None) -> Iterator[Dict]:
+        """
+        Iterate certificates still waiting for a stage of work, without scanning the registry
+        
+        Args:
+            kind: "pdf" (no PDF generated), "email" (not emailed) or "api" (not pushed
+                to the web validation service)
+            limit: Maximum number of records (default: all)
+            
+        Returns:
+            Iterator of certificate records, oldest first
+        """
+        if kind not in STATUS_FLAGS:
+            raise ValueError(f"Unknown pending kind '{kind}' (expected one of: {', '.join(STATUS_FLAGS)})")
+        return self._store.pending(kind, limit)
     
     def get_all_certificates(self) -> List[Dict]:
         """Get all certificate records"""
-        return list(self.registry["certificates"].values())
+        return list(self._store.records())
     
-    def update_certificate_status(self, name: str, **updates):
-        """Update certificate status (email_sent, api_registered, etc.)"""
-        lookup_key = name.strip().lower()
-        if lookup_key in self.registry["certificates"]:
-            self.registry["certificates"][lookup_key].update(updates)
-            self._save_registry()
+    def update_certificate_status(self, name: str, course: str = None, **updates):
+        """
+        Update certificate status (email_sent, api_registered, etc.)
+        
+        Without a course, every certificate registered for the recipient is updated.
+        """
+        self.update_many([(name, course, updates)])
+    
+    def update_many(self, updates: Iterable[Tuple[str, Optional[str], Dict]]) -> int:
+        """
+        Update the status of many certificates with a single registry write
+        
+        Args:
+            updates: (name, course, fields) tuples, e.g. ("Jane Doe", "Python", {"email_sent": True});
+                a course of None updates all of that recipient's certificates
+            
+        Returns:
+            Number of certificates found and updated
+        """
+        updated = 0
+        with self._store.batch():
+            for name, course, fields in updates:
+                if course is not None:
+                    keys = [self.record_key(name, course)]
+                else:
+                    keys = [self.record_key(record["name"], record["course"])
+                            for record in self.get_certificates(name)]
+                for key in keys:
+                    if self._store.update(key, fields):
+                        updated += 1
+        return updated
     
-    def get_template_fields(self, name: str) -> Dict[str, str]:
+    def get_template_fields(self, name: str, course: str = None) -> Dict[str, str]:
         """
         Get template fields for email/API with guaranteed integrity
         
+        Args:
+            name: Recipient name
+            course: Course name (default: the recipient's most recent certificate)
+        
         Returns:
             Dictionary with keys: name, course_name, cert_id
             These values are guaranteed to match the PDF and API exactly
         """
-        cert_record = self.get_certificate(name)
+        cert_record = self.get_certificate(name, course)
         if cert_record:
             return {
                 "name": cert_record["name"],
@@ -165,96 +444,265 @@ class CertificateRegistry:
             return recipients
         
         try:
-            with open(self.recipients_file, 'r', encoding='utf-8') as f:
-                for line_num, line in enumerate(f, 1):
-                    line = line.strip()
-                    if not line or line.startswith('#'):
-                        continue
-                    
-                    parts = line.split(',')
-                    if len(parts) >= 2:
-                        recipients.append({
-                            'name': parts[0].strip(),
-                            'course': parts[1].strip()
-                        })
-                    else:
-                        print(f"⚠️  Warning: Invalid format on line {line_num}")
+            recipients.extend(iter_recipients(self.recipients_file))
         except Exception as e:
             print(f"⚠️  Error reading recipients file: {e}")
         
         return recipients
     
     def export_to_legacy_log(self):
-        """Export registry to legacy certificate_ids.log format for compatibility"""
+        """
+        Append certificates registered since the last export to the legacy certificate_ids.log
+        
+        The registry_seq of the last exported record is kept in the registry metadata
+        (legacy_log_seq). Records imported from the log by sync_with_legacy_log() are
+        already in it and are not appended again. Without legacy_log_seq, or without a
+        log, the log is written from scratch with compact_legacy_log().
+        """
         log_file = os.path.join(self.output_dir, "certificate_ids.log")
         try:
-            with open(log_file, 'w', encoding='utf-8') as f:
-                f.write(f"{'='*60}\n")
-                f.write(f"Certificate Registry Export - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write(f"{'='*60}\n")
+            with self._store.batch():
+                metadata = self._store.metadata
+                if "legacy_log_seq" not in metadata or not os.path.exists(log_file):
+                    self.compact_legacy_log()
+                    return
                 
-                for cert in self.get_all_certificates():
-                    f.write(f"{cert['certificate_id']} | {cert['name']} | {cert['course']}\n")
+                new_certificates = list(self._store.registered_since(metadata["legacy_log_seq"]))
+                if not new_certificates:
+                    return
+                fields = {"legacy_log_seq": new_certificates[-1]["registry_seq"]}
+                new_certificates = [cert for cert in new_certificates if not cert.get("legacy_log_imported")]
+                if not new_certificates:
+                    self._store.set_metadata(**fields)
+                    return
                 
-                f.write(f"{'='*60}\n")
+                watermark = metadata.get("legacy_log_sync") or {}
+                with open(log_file, 'r+b') as f:
+                    # Lines someone else added since the last sync still have to be synced
+                    in_sync = watermark.get("offset") == f.seek(0, os.SEEK_END) and \
+                        self._legacy_log_watermark(f, watermark["offset"]) == watermark
+                    f.seek(0, os.SEEK_END)
+                    f.write(''.join(self._legacy_log_lines(new_certificates)).encode('utf-8'))
+                    
+                    if in_sync:
+                        fields["legacy_log_sync"] = self._legacy_log_watermark(f, f.tell())
+                self._store.set_metadata(**fields)
+            
+            print(f"📄 Appended {len(new_certificates)} certificates to legacy log: {log_file}")
+        except Exception as e:
+            print(f"⚠️  Warning: Could not export to legacy log: {e}")
+    
+    def compact_legacy_log(self):
+        """Rewrite the legacy certificate_ids.log from scratch with one line per registry record"""
+        log_file = os.path.join(self.output_dir, "certificate_ids.log")
+        temp_file = f"{log_file}.{os.getpid()}.tmp"
+        try:
+            with self._store.batch():
+                os.makedirs(self.output_dir, exist_ok=True)
+                with open(temp_file, 'w', encoding='utf-8') as f:
+                    f.writelines(self._legacy_log_lines(self._store.records()))
+                os.replace(temp_file, log_file)
+                
+                # Everything in the log now comes from the registry: nothing to sync back
+                with open(log_file, 'rb') as f:
+                    self._store.set_metadata(
+                        legacy_log_seq=self._store.metadata.get("registry_seq", 0),
+                        legacy_log_sync=self._legacy_log_watermark(f, os.path.getsize(log_file)))
             
             print(f"📄 Exported registry to legacy log: {log_file}")
         except Exception as e:
             print(f"⚠️  Warning: Could not export to legacy log: {e}")
     
+    @staticmethod
+    def _legacy_log_lines(certificates: Iterable[Dict]) -> Iterator[str]:
+        """Lines of one export block in the certificate_ids.log format"""
+        yield f"{'='*60}\n"
+        yield f"Certificate Registry Export - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+        yield f"{'='*60}\n"
+        for cert in certificates:
+            yield f"{cert['certificate_id']} | {cert['name']} | {cert['course']}\n"
+        yield f"{'='*60}\n"
+    
+    @staticmethod
+    def _legacy_log_watermark(f, offset: int) -> Dict:
+        """Position in the legacy log plus a hash of the bytes at the start and just before it"""
+        f.seek(0)
+        digest = hashlib.sha256(f.read(min(offset, LEGACY_LOG_HASH_BYTES)))
+        f.seek(max(0, offset - LEGACY_LOG_HASH_BYTES))
+        digest.update(f.read(min(offset, LEGACY_LOG_HASH_BYTES)))
+        return {"offset": offset, "hash": digest.hexdigest()}
+    
     def sync_with_legacy_log(self):
-        """Import existing certificates from legacy certificate_ids.log"""
+        """
+        Import certificates from the legacy certificate_ids.log that the registry doesn't have
+        
+        Only lines added since the last sync are read: the position reached (and a hash of
+        the bytes around it) is kept in the registry metadata. If the log hasn't grown the
+        sync is skipped; if it was rewritten or replaced it is read from the start again.
+        Imported records are marked legacy_log_imported so they aren't exported back.
+        """
         log_file = os.path.join(self.output_dir, "certificate_ids.log")
         if not os.path.exists(log_file):
             return
         
-        print("🔄 Syncing with legacy certificate log...")
         try:
-            with open(log_file, 'r', encoding='utf-8') as f:
-                for line in f:
+            # One batch, so the check and the registration are atomic across processes
+            with self._store.batch():
+                watermark = self._store.metadata.get("legacy_log_sync") or {}
+                with open(log_file, 'rb') as f:
+                    size = os.fstat(f.fileno()).st_size
+                    offset = watermark.get("offset", 0)
+                    if offset > size or (offset and self._legacy_log_watermark(f, offset) != watermark):
+                        offset = 0
+                    if offset == size:
+                        return
+                    
+                    f.seek(offset)
+                    data = f.read(size - offset)
+                    # A line still being written is picked up next time
+                    end = offset + data.rfind(b'\n') + 1
+                    if end == offset:
+                        return
+                    lines = data[:end - offset].decode('utf-8').splitlines()
+                    new_watermark = self._legacy_log_watermark(f, end)
+                
+                print("🔄 Syncing with legacy certificate log...")
+                missing = []
+                seen = set()
+                for line in lines:
                     line = line.strip()
                     if '|' in line and not line.startswith('=') and not line.startswith('Certificate'):
                         parts = [p.strip() for p in line.split('|')]
                         if len(parts) >= 3:
                             cert_id, name, course = parts[0], parts[1], parts[2]
                             
-                            # Only add if not already in registry
-                            if not self.get_certificate(name):
-                                self.register_certificate(
-                                    name=name,
-                                    course=course,
-                                    cert_id=cert_id,
-                                    issue_date=datetime.now().strftime('%Y-%m-%d')
-                                )
-            
+                            # Only add if not already in registry (first log entry wins);
+                            # a known certificate ID is the cheap check
+                            lookup_key = self.record_key(name, course)
+                            if name and course and cert_id and lookup_key not in seen \
+                                    and not self.get_by_certificate_id(cert_id) \
+                                    and not self.get_certificate(name, course):
+                                seen.add(lookup_key)
+                                missing.append({
+                                    "name": name,
+                                    "course": course,
+                                    "cert_id": cert_id,
+                                    "issue_date": datetime.now().strftime('%Y-%m-%d')
+                                })
+                
+                items = [self._build_record(**entry) for entry in missing]
+                for _, cert_record in items:
+                    cert_record["legacy_log_imported"] = True
+                if items:
+                    self._put_records(items)
+                    print(f"📝 Registered {len(items)} certificates")
+                self._store.set_metadata(legacy_log_sync=new_watermark)
             print("✅ Legacy log sync completed")
         except Exception as e:
             print(f"⚠️  Warning: Could not sync with legacy log: {e}")
 
 
+def _resolve_backend(backend: Optional[str], db_file: str) -> str:
+    """The backend to use: the one given, else $CERTIFICATE_REGISTRY_BACKEND, else by the files present"""
+    if backend is None:
+        backend = os.environ.get("CERTIFICATE_REGISTRY_BACKEND") or \
+            ("sqlite" if os.path.exists(db_file) else "json")
+    if backend not in REGISTRY_BACKENDS:
+        raise ValueError(f"Unknown registry backend '{backend}' (expected one of: {', '.join(REGISTRY_BACKENDS)})")
+    return backend
+
+
+def _with_pending_counts(counts: Dict[str, int]) -> Dict[str, int]:
+    """Add pending_<kind> counts (total minus the matching status count)"""
+    for kind, flag in STATUS_FLAGS.items():
+        counts[f"pending_{kind}"] = counts["total"] - counts[flag]
+    return counts
+
+
+def read_status_counts(base_dir: str = "data/certificates", backend: str = None) -> Dict[str, int]:
+    """
+    Certificate counts by status (as CertificateRegistry.status_counts()) without
+    loading the registry
+    
+    SQLite reads the trigger-maintained counts table. The JSON backend reads the counts
+    cached next to the snapshot, and only loads the store when the journal holds changes
+    not yet compacted (e.g. while a run is in progress) or the cache is out of date.
+    """
+    registry_file = os.path.join(base_dir, "certificate_registry.json")
+    journal_file = os.path.join(base_dir, "certificate_registry.journal")
+    db_file = os.path.join(base_dir, "certificate_registry.db")
+    
+    if _resolve_backend(backend, db_file) == "sqlite":
+        store = SQLiteStore(db_file)
+        try:
+            return _with_pending_counts(store.status_counts())
+        finally:
+            store.close()
+    
+    counts = JsonJournalStore.cached_status_counts(registry_file, journal_file)
+    if counts is None:
+        counts = JsonJournalStore(registry_file, journal_file).status_counts()
+    return _with_pending_counts(counts)
+
+
 # Global registry instance
 _registry = None
+_registry_lock = threading.Lock()
 
 def get_registry() -> CertificateRegistry:
-    """Get the global certificate registry instance"""
+    """Get the global certificate registry instance (safe to call from several threads)"""
     global _registry
     if _registry is None:
-        _registry = CertificateRegistry()
-        # Sync with existing data on first load
-        _registry.sync_with_legacy_log()
+        with _registry_lock:
+            if _registry is None:
+                registry = CertificateRegistry()
+                # Sync with existing data on first load
+                registry.sync_with_legacy_log()
+                _registry = registry
+                # Leave certificate_registry.json up to date when the run ends
+                atexit.register(close_registry)
     return _registry
 
 
+def close_registry():
+    """Close the global registry instance (the next get_registry() loads it again)"""
+    global _registry
+    with _registry_lock:
+        if _registry is not None:
+            _registry.close()
+            _registry = None
+
+
 def register_certificate(name: str, course: str, cert_id: str, **kwargs) -> Dict:
     """Convenience function to register a certificate"""
     return get_registry().register_certificate(name, course, cert_id, **kwargs)
 
 
-def get_certificate_fields(name: str) -> Dict[str, str]:
+def get_certificate_fields(name: str, course: str = None) -> Dict[str, str]:
     """Convenience function to get template fields for a recipient"""
-    return get_registry().get_template_fields(name)
+    return get_registry().get_template_fields(name, course)
+
+
+def get_recipient_certificates(name: str) -> List[Dict]:
+    """Convenience function to get every certificate registered for a recipient"""
+    return get_registry().get_certificates(name)
+
+
+def get_certificate_by_id(cert_id: str) -> Optional[Dict]:
+    """Convenience function to look up a certificate record by certificate ID"""
+    return get_registry().get_by_certificate_id(cert_id)
 
 
-def update_certificate_status(name: str, **updates):
+def verify_certificate(cert_id: str, name: str = None) -> Optional[Dict]:
+    """Convenience function to verify a certificate ID against the registry"""
+    return get_registry().verify_certificate(cert_id, name)
+
+
+def update_certificate_status(name: str, course: str = None, **updates):
     """Convenience function to update certificate status"""
-    return get_registry().update_certificate_status(name, **updates)
+    return get_registry().update_certificate_status(name, course, **updates)
+
+
+def update_certificate_statuses(updates: Iterable[Tuple[str, Optional[str], Dict]]) -> int:
+    """Convenience function to update many certificate statuses in one write"""
+    return get_registry().update_many(updates)
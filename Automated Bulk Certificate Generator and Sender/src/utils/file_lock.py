@@ -0,0 +1,106 @@
+"""
+File Lock Module
+Advisory lock on a lock file, so several processes (e.g. two main.py jobs) can take
+turns updating files they share
+"""
+
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+
+def _lock_file(f):
+    """Block until this process holds the lock on an open file"""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        return
+    
+    f.seek(0)
+    while True:
+        try:
+            # LK_LOCK itself retries for about 10 seconds before giving up
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            time.sleep(0.1)
+
+
+def _unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class FileLock:
+    """
+    Re-entrant exclusive lock held through a lock file
+    
+    The operating system lock is taken when the outermost holder enters and released
+    when it exits; nested use from the same thread only counts depth. Threads of one
+    process queue on an in-process lock first, so one FileLock can be shared by a thread
+    pool. The lock is advisory: only code that uses it is kept out.
+    
+    Usage:
+        with FileLock("data/certificates/certificate_registry.lock"):
+            ...
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+    
+    def acquire(self):
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                self._file = open(self.path, 'a+b')
+                _lock_file(self._file)
+            except BaseException:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+    
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            try:
+                _unlock_file(self._file)
+            finally:
+                self._file.close()
+                self._file = None
+        self._thread_lock.release()
+    
+    def __enter__(self):
+        self.acquire()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+def file_stamp(path: str):
+    """
+    Identify a file's current contents by (inode, mtime in ns, size)
+    
+    The stamp changes when the file is replaced or rewritten. Returns None if the file
+    doesn't exist.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
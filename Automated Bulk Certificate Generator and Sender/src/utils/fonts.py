@@ -0,0 +1,196 @@
+"""
+Font Module
+Registers TrueType fonts from the certificate configuration once per process, caches
+glyph-width tables for fast string measurement, and prepares embeddable font subsets
+for stamping text directly into PDF pages
+"""
+
+import hashlib
+import os
+import zlib
+from typing import Dict
+
+from PyPDF2.generic import (ArrayObject, DictionaryObject, EncodedStreamObject, FloatObject,
+                            NameObject, NumberObject)
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont, makeToUnicodeCMap
+
+
+# Subset used for embedded TrueType fonts: character codes 0-255 map to the
+# Latin-1 code points, so text is encoded with plain 'latin-1'
+EMBEDDED_SUBSET = list(range(256))
+EMBEDDED_ENCODING = 'latin-1'
+
+# font name -> TTF path for fonts registered by this module
+_registered_fonts: Dict[str, str] = {}
+
+# font name -> cached metrics / embeddable font
+_metrics_cache: Dict[str, "FontMetrics"] = {}
+_embedded_cache: Dict[str, "EmbeddedFont"] = {}
+
+
+def register_config_fonts(config: Dict, base_dir: str = '.'):
+    """
+    Register the TrueType fonts listed in a certificate configuration
+    
+    The optional "fonts" section maps a font family to TTF files per weight:
+        
+        "fonts": {"Roboto": {"normal": "fonts/Roboto-Regular.ttf",
+                             "bold": "fonts/Roboto-Bold.ttf"}}
+    
+    The normal weight is registered as the family name and the bold weight as
+    "<family>-Bold", matching how fields resolve their font. Registering the same
+    file again is a no-op, so this is safe to call once per process or per run.
+    
+    Raises:
+        FileNotFoundError: If a configured font file does not exist
+    """
+    for family, weights in config.get('fonts', {}).items():
+        for weight, font_path in weights.items():
+            if weight not in ('normal', 'bold'):
+                raise ValueError(f"Invalid font weight '{weight}' for font family '{family}'. Expected 'normal' or 'bold'")
+            
+            font_name = f"{family}-Bold" if weight == 'bold' else family
+            font_path = os.path.abspath(os.path.join(base_dir, font_path))
+            if _registered_fonts.get(font_name) == font_path:
+                continue
+            
+            if not os.path.exists(font_path):
+                raise FileNotFoundError(f"Font file not found: {font_path}")
+            
+            pdfmetrics.registerFont(TTFont(font_name, font_path))
+            _registered_fonts[font_name] = font_path
+            _metrics_cache.pop(font_name, None)
+            _embedded_cache.pop(font_name, None)
+
+
+def is_truetype_font(font_name: str) -> bool:
+    """Check whether a registered font is a TrueType font (needs embedding)"""
+    return isinstance(pdfmetrics.getFont(font_name), TTFont)
+
+
+class FontMetrics:
+    """Cached glyph advance widths (in 1/1000 em) for one registered font"""
+    
+    def __init__(self, font_name: str):
+        self.font_name = font_name
+        font = pdfmetrics.getFont(font_name)
+        
+        if isinstance(font, TTFont):
+            self.widths = {chr(code): width for code, width in font.face.charWidths.items()}
+        else:
+            # Standard fonts: widths are indexed by byte in the font's encoding
+            encoding = 'cp1252' if font.encoding.name == 'WinAnsiEncoding' else 'latin-1'
+            self.widths = {}
+            for code, width in enumerate(font.widths):
+                try:
+                    self.widths[bytes([code]).decode(encoding)] = width
+                except UnicodeDecodeError:
+                    continue
+    
+    def string_width(self, text: str, font_size: float) -> float:
+        """Get the width of text in points"""
+        try:
+            return sum(map(self.widths.__getitem__, text)) * font_size / 1000
+        except KeyError:
+            # Characters outside the cached table: let reportlab decide
+            return pdfmetrics.stringWidth(text, self.font_name, font_size)
+
+
+def get_font_metrics(font_name: str) -> FontMetrics:
+    """Get the cached metrics for a registered font"""
+    metrics = _metrics_cache.get(font_name)
+    if metrics is None:
+        metrics = _metrics_cache[font_name] = FontMetrics(font_name)
+    return metrics
+
+
+def string_width(text: str, font_name: str, font_size: float) -> float:
+    """Get the width of text in points using cached glyph widths (no canvas needed)"""
+    return get_font_metrics(font_name).string_width(text, font_size)
+
+
+class EmbeddedFont:
+    """
+    A TrueType font subset prepared once per run for embedding into PDF pages
+    
+    The subset program is built and compressed once; add_to_writer() only creates
+    the small font dictionaries that point at the shared compressed data.
+    """
+    
+    def __init__(self, font_name: str):
+        face = pdfmetrics.getFont(font_name).face
+        postscript_name = face.name.decode('latin-1')
+        
+        # Six-letter subset tag derived from the font name, so it stays stable across runs
+        # and doesn't clash with subsets already embedded in the template
+        tag = ''.join(chr(ord('A') + byte % 26) for byte in hashlib.md5(face.name).digest()[:6])
+        self.base_font = f"{tag}+{postscript_name}"
+        
+        font_program = face.makeSubset(EMBEDDED_SUBSET)
+        self.font_file_length = len(font_program)
+        self.font_file_data = zlib.compress(font_program)
+        self.to_unicode_data = zlib.compress(
+            makeToUnicodeCMap(self.base_font, EMBEDDED_SUBSET).encode('latin-1'))
+        self.widths = [face.getCharWidth(code) for code in EMBEDDED_SUBSET]
+        
+        # Same flags reportlab uses for its subsets: symbolic, not non-symbolic
+        self.descriptor_values = {
+            '/Ascent': face.ascent,
+            '/CapHeight': face.capHeight,
+            '/Descent': face.descent,
+            '/Flags': (face.flags & ~32) | 4,
+            '/FontBBox': face.bbox,
+            '/ItalicAngle': face.italicAngle,
+            '/StemV': face.stemV,
+            '/MissingWidth': face.defaultWidth,
+        }
+    
+    @staticmethod
+    def _pdf_number(value):
+        return NumberObject(value) if isinstance(value, int) else FloatObject(value)
+    
+    @staticmethod
+    def _flate_stream(data: bytes, **entries) -> EncodedStreamObject:
+        stream = EncodedStreamObject()
+        stream[NameObject('/Filter')] = NameObject('/FlateDecode')
+        for key, value in entries.items():
+            stream[NameObject(key)] = value
+        stream._data = data
+        return stream
+    
+    def add_to_writer(self, writer):
+        """Add this font to a PdfWriter and return the font dictionary reference"""
+        font_file = writer._add_object(self._flate_stream(
+            self.font_file_data, **{'/Length1': NumberObject(self.font_file_length)}))
+        
+        descriptor = DictionaryObject({
+            NameObject('/Type'): NameObject('/FontDescriptor'),
+            NameObject('/FontName'): NameObject(f"/{self.base_font}"),
+            NameObject('/FontFile2'): font_file,
+        })
+        for key, value in self.descriptor_values.items():
+            if isinstance(value, (list, tuple)):
+                descriptor[NameObject(key)] = ArrayObject(self._pdf_number(v) for v in value)
+            else:
+                descriptor[NameObject(key)] = self._pdf_number(value)
+        
+        font = DictionaryObject({
+            NameObject('/Type'): NameObject('/Font'),
+            NameObject('/Subtype'): NameObject('/TrueType'),
+            NameObject('/BaseFont'): NameObject(f"/{self.base_font}"),
+            NameObject('/FirstChar'): NumberObject(0),
+            NameObject('/LastChar'): NumberObject(len(EMBEDDED_SUBSET) - 1),
+            NameObject('/Widths'): ArrayObject(self._pdf_number(w) for w in self.widths),
+            NameObject('/FontDescriptor'): writer._add_object(descriptor),
+            NameObject('/ToUnicode'): writer._add_object(self._flate_stream(self.to_unicode_data)),
+        })
+        return writer._add_object(font)
+
+
+def get_embedded_font(font_name: str) -> EmbeddedFont:
+    """Get the cached embeddable subset for a registered TrueType font"""
+    embedded = _embedded_cache.get(font_name)
+    if embedded is None:
+        embedded = _embedded_cache[font_name] = EmbeddedFont(font_name)
+    return embedded
@@ -0,0 +1,149 @@
+"""
+PDF Optimize Module
+Shrinks a template page once per run so every certificate cloned from it is smaller:
+identical streams (images, fonts, ICC profiles) are shared and uncompressed streams are
+Flate-compressed
+"""
+
+import hashlib
+import zlib
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Dict, Tuple
+
+from PyPDF2 import PdfWriter
+from PyPDF2.generic import (ArrayObject, DecodedStreamObject, DictionaryObject,
+                            EncodedStreamObject, IndirectObject, NameObject, StreamObject)
+
+
+# Streams smaller than this aren't worth a zlib header
+MIN_COMPRESS_SIZE = 64
+
+# Bytes the "/Filter /FlateDecode" entry adds to a compressed stream's dictionary
+FILTER_ENTRY_SIZE = len(b'/Filter /FlateDecode ')
+
+
+@dataclass(frozen=True)
+class OptimizationStats:
+    """Byte counts for a single-page document before and after optimization"""
+    size_before: int
+    size_after: int
+    streams_compressed: int
+    streams_deduplicated: int
+    
+    @property
+    def bytes_saved(self) -> int:
+        return self.size_before - self.size_after
+
+
+def _stream_key(stream: StreamObject) -> str:
+    """Hash a stream's dictionary (without /Length) and raw data"""
+    entries = BytesIO()
+    for key in sorted(stream):
+        if key != '/Length':
+            entries.write(key.encode('latin-1'))
+            stream[key].write_to_stream(entries, None)
+    digest = hashlib.sha256(entries.getvalue())
+    digest.update(stream._data)
+    return digest.hexdigest()
+
+
+def deduplicate_streams(page) -> int:
+    """
+    Point every reference to an identical stream reachable from a page at one copy
+    
+    The page and the objects under it are modified in place, so only use this on a
+    page owned by the caller (e.g. a freshly parsed template). Returns the number of
+    references that were redirected.
+    """
+    canonical: Dict[str, IndirectObject] = {}
+    keys: Dict[Tuple[int, int], str] = {}
+    visited = set()
+    redirected = 0
+    
+    stack = [page]
+    while stack:
+        container = stack.pop()
+        items = container.items() if isinstance(container, DictionaryObject) else enumerate(container)
+        for key, value in list(items):
+            if key == '/Parent':
+                continue
+            
+            if isinstance(value, IndirectObject):
+                ref_id = (value.idnum, value.generation)
+                target = value.get_object()
+                if isinstance(target, StreamObject):
+                    if ref_id not in keys:
+                        keys[ref_id] = _stream_key(target)
+                    first = canonical.setdefault(keys[ref_id], value)
+                    if (first.idnum, first.generation) != ref_id:
+                        container[key] = first
+                        redirected += 1
+                        continue
+                if ref_id in visited:
+                    continue
+                visited.add(ref_id)
+                value = target
+            
+            if isinstance(value, (DictionaryObject, ArrayObject)):
+                stack.append(value)
+    
+    return redirected
+
+
+def compress_streams(writer: PdfWriter) -> int:
+    """Flate-compress the writer's unfiltered streams where that makes them smaller"""
+    compressed = 0
+    for index, obj in enumerate(writer._objects):
+        if not isinstance(obj, DecodedStreamObject) or '/Filter' in obj:
+            continue
+        data = obj.get_data()
+        if len(data) < MIN_COMPRESS_SIZE:
+            continue
+        
+        packed = zlib.compress(data, 9)
+        if len(packed) + FILTER_ENTRY_SIZE >= len(data):
+            continue
+        
+        stream = EncodedStreamObject()
+        for key, value in obj.items():
+            if key != '/Length':
+                stream[NameObject(key)] = value
+        stream[NameObject('/Filter')] = NameObject('/FlateDecode')
+        stream._data = packed
+        stream.indirect_reference = obj.indirect_reference
+        writer._objects[index] = stream
+        compressed += 1
+    
+    return compressed
+
+
+def serialized_size(writer: PdfWriter) -> int:
+    """Get the number of bytes writer.write() would produce"""
+    buffer = BytesIO()
+    writer.write(buffer)
+    return buffer.tell()
+
+
+def optimize_page(page):
+    """
+    Copy a page into its own writer with shared duplicate streams and compressed content
+    
+    The source page is deduplicated in place. Returns the optimized page (clone it into
+    each output writer with PdfWriter.add_page()) and the byte counts of the page as a
+    one-page document before and after.
+    """
+    original = PdfWriter()
+    original.add_page(page)
+    size_before = serialized_size(original)
+    
+    deduplicated = deduplicate_streams(page)
+    optimized = PdfWriter()
+    optimized_page = optimized.add_page(page)
+    compressed = compress_streams(optimized)
+    
+    stats = OptimizationStats(size_before=size_before,
+                              size_after=serialized_size(optimized),
+                              streams_compressed=compressed,
+                              streams_deduplicated=deduplicated)
+    return optimized_page, stats
@@ -0,0 +1,152 @@
+"""
+PDF Stream Module
+Append-only PDF writer that serializes each object to disk as soon as it is added, so
+documents with thousands of pages can be built without holding the pages in memory
+"""
+
+import os
+from typing import Dict, List, Optional, Tuple
+
+from PyPDF2.generic import (ArrayObject, DecodedStreamObject, DictionaryObject,
+                            EncodedStreamObject, IndirectObject, NameObject, NumberObject,
+                            StreamObject)
+
+
+PDF_HEADER = b'%PDF-1.7\n%\xe2\xe3\xcf\xd3\n'
+
+
+class StreamingPdfWriter:
+    """
+    Minimal streaming PDF writer
+    
+    Objects are written to "<path>.part" as they are added; only their byte offsets and
+    the page object numbers stay in memory. close() writes the page tree, cross-reference
+    table and trailer, then renames the file into place, so a half-written document never
+    appears under the final name.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._part_path = f"{path}.part"
+        self._file = open(self._part_path, 'wb')
+        self._file.write(PDF_HEADER)
+        
+        # Byte offset of every object, indexed by object number (0 = not written yet)
+        self._offsets: List[int] = [0]
+        self._page_ids: List[int] = []
+        self._pages_id = self.reserve()
+    
+    @property
+    def page_count(self) -> int:
+        return len(self._page_ids)
+    
+    def reserve(self) -> int:
+        """Reserve an object number to be written later"""
+        self._offsets.append(0)
+        return len(self._offsets) - 1
+    
+    def write_object(self, obj, idnum: Optional[int] = None) -> IndirectObject:
+        """Write an object (to a reserved number, if given) and return a reference to it"""
+        if idnum is None:
+            idnum = self.reserve()
+        
+        self._offsets[idnum] = self._file.tell()
+        self._file.write(b'%d 0 obj\n' % idnum)
+        obj.write_to_stream(self._file, None)
+        self._file.write(b'\nendobj\n')
+        return IndirectObject(idnum, 0, self)
+    
+    def import_object(self, obj, ref_map: Optional[Dict[Tuple[int, int], int]] = None):
+        """
+        Copy an object from another PDF (a PdfReader or PdfWriter) into this file
+        
+        Every indirect object it references is written once. ref_map maps the source's
+        object numbers to ours; pass the same dict to share objects between imports from
+        the same source, and a new one for each source. Returns the copy with its
+        references renumbered.
+        """
+        if ref_map is None:
+            ref_map = {}
+        
+        pending = []
+        copy = self._translate(obj, ref_map, pending)
+        while pending:
+            idnum, reference = pending.pop()
+            self.write_object(self._translate(reference.get_object(), ref_map, pending), idnum)
+        return copy
+    
+    def _translate(self, value, ref_map, pending):
+        """Copy a source object, renumbering references and queueing them for writing"""
+        if isinstance(value, IndirectObject):
+            key = (value.idnum, value.generation)
+            idnum = ref_map.get(key)
+            if idnum is None:
+                idnum = ref_map[key] = self.reserve()
+                pending.append((idnum, value))
+            return IndirectObject(idnum, 0, self)
+        
+        if isinstance(value, StreamObject):
+            if isinstance(value, EncodedStreamObject):
+                copy = EncodedStreamObject()
+                copy._data = value._data
+            else:
+                copy = DecodedStreamObject()
+                copy.set_data(value.get_data())
+            for key, item in value.items():
+                if key != '/Length':
+                    copy[NameObject(key)] = self._translate(item, ref_map, pending)
+            return copy
+        
+        if isinstance(value, DictionaryObject):
+            return DictionaryObject({NameObject(key): self._translate(item, ref_map, pending)
+                                     for key, item in value.items()})
+        
+        if isinstance(value, ArrayObject):
+            return ArrayObject(self._translate(item, ref_map, pending) for item in value)
+        
+        return value
+    
+    def add_page(self, page: DictionaryObject) -> IndirectObject:
+        """Write a page dictionary and append it to the document"""
+        page[NameObject('/Type')] = NameObject('/Page')
+        page[NameObject('/Parent')] = IndirectObject(self._pages_id, 0, self)
+        reference = self.write_object(page)
+        self._page_ids.append(reference.idnum)
+        return reference
+    
+    def close(self):
+        """Write the page tree, cross-reference table and trailer, and move the file into place"""
+        self.write_object(DictionaryObject({
+            NameObject('/Type'): NameObject('/Pages'),
+            NameObject('/Kids'): ArrayObject(IndirectObject(idnum, 0, self) for idnum in self._page_ids),
+            NameObject('/Count'): NumberObject(len(self._page_ids)),
+        }), self._pages_id)
+        root = self.write_object(DictionaryObject({
+            NameObject('/Type'): NameObject('/Catalog'),
+            NameObject('/Pages'): IndirectObject(self._pages_id, 0, self),
+        }))
+        
+        xref_offset = self._file.tell()
+        self._file.write(b'xref\n0 %d\n' % len(self._offsets))
+        self._file.write(b'0000000000 65535 f\r\n')
+        for offset in self._offsets[1:]:
+            if offset:
+                self._file.write(b'%010d 00000 n\r\n' % offset)
+            else:
+                self._file.write(b'0000000000 00000 f\r\n')
+        
+        self._file.write(b'trailer\n')
+        DictionaryObject({
+            NameObject('/Size'): NumberObject(len(self._offsets)),
+            NameObject('/Root'): root,
+        }).write_to_stream(self._file, None)
+        self._file.write(b'\nstartxref\n%d\n%%%%EOF\n' % xref_offset)
+        
+        self._file.close()
+        os.replace(self._part_path, self.path)
+    
+    def abort(self):
+        """Stop writing and remove the partial file"""
+        self._file.close()
+        if os.path.exists(self._part_path):
+            os.remove(self._part_path)
@@ -0,0 +1,132 @@
+"""
+Rate Limiter Module
+Token bucket that paces outgoing email and adapts to the server's throttling replies:
+it slows down when the provider answers 421, 451 or a 4.7.x status and speeds back up
+after a run of successful sends
+"""
+
+import smtplib
+import threading
+import time
+
+
+# SMTP reply codes providers use to say "too many messages, try later"
+THROTTLE_CODES = (421, 451)
+
+# Enhanced status class for temporary policy failures (e.g. "4.7.0 Try again later")
+THROTTLE_STATUS_PREFIX = b"4.7."
+
+# Seconds after a backoff in which further throttling replies don't slow down again
+# (providers count messages over windows of a second or more)
+BACKOFF_WINDOW = 1.0
+
+
+def _is_throttle_reply(code: int, message) -> bool:
+    if isinstance(message, str):
+        message = message.encode('utf-8', 'replace')
+    return code in THROTTLE_CODES or (400 <= code < 500 and message.lstrip().startswith(THROTTLE_STATUS_PREFIX))
+
+
+def is_throttling_error(error: Exception) -> bool:
+    """Whether an SMTP error is the server asking us to slow down"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return bool(error.recipients) and all(_is_throttle_reply(code, message)
+                                              for code, message in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return _is_throttle_reply(error.smtp_code, error.smtp_error)
+    return False
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket with adaptive rate
+    
+    Tokens refill at the current rate up to a bucket size that shrinks with the rate,
+    so bursts get smaller while the server is throttling. throttled() multiplies the
+    rate by backoff (down to min_rate) and pauses sending for BACKOFF_WINDOW seconds.
+    Replies that arrive within that window (or one send interval, if longer) of the
+    last backoff answer the same burst and count once. After recover_after consecutive
+    succeeded() calls the rate grows by recovery, up to the configured rate.
+    
+    Usage:
+        limiter = RateLimiter(messages_per_second=5, burst=10)
+        limiter.acquire()  # blocks until a message may go out
+        ...
+        limiter.succeeded()  # or limiter.throttled() on a 421/451/4.7.x reply
+    """
+    
+    def __init__(self, messages_per_second: float, burst: int = 1, min_rate: float = None,
+                 backoff: float = 0.5, recovery: float = 1.25, recover_after: int = 20):
+        """
+        Args:
+            messages_per_second: Highest sending rate
+            burst: Messages that may go out back to back after an idle period
+            min_rate: Lowest rate backing off can reach (default: a 32nd of the rate)
+            backoff: Factor applied to the rate on each throttling reply
+            recovery: Factor applied to the rate after recover_after successes in a row
+            recover_after: Successful sends in a row before the rate is raised again
+        """
+        if messages_per_second <= 0:
+            raise ValueError(f"Messages per second must be positive, got {messages_per_second}")
+        if burst < 1:
+            raise ValueError(f"Burst size must be at least 1, got {burst}")
+        if not 0 < backoff < 1 or recovery <= 1:
+            raise ValueError("Backoff must be between 0 and 1 and recovery greater than 1")
+        
+        self.max_rate = float(messages_per_second)
+        self.min_rate = float(min_rate) if min_rate else self.max_rate / 32
+        self.rate = self.max_rate
+        self.burst = burst
+        self.backoff = backoff
+        self.recovery = recovery
+        self.recover_after = recover_after
+        
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._successes = 0
+        self._last_backoff = None
+        self._lock = threading.Lock()
+    
+    @property
+    def capacity(self) -> float:
+        """Current bucket size: the burst scaled down with the rate, at least one message"""
+        return max(1.0, self.burst * self.rate / self.max_rate)
+    
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    def acquire(self):
+        """Block until a message may be sent"""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+    
+    def succeeded(self):
+        """Record a message the server accepted"""
+        with self._lock:
+            self._successes += 1
+            if self._successes >= self.recover_after and self.rate < self.max_rate:
+                self._refill()
+                self.rate = min(self.max_rate, self.rate * self.recovery)
+                self._successes = 0
+    
+    def throttled(self) -> float:
+        """Record a throttling reply: slow down and pause; returns the new rate"""
+        with self._lock:
+            self._refill()
+            self._successes = 0
+            if self._last_backoff is not None and \
+                    self._updated - self._last_backoff < max(BACKOFF_WINDOW, 1 / self.rate):
+                return self.rate
+            self._last_backoff = self._updated
+            self.rate = max(self.min_rate, self.rate * self.backoff)
+            # Owe a window's worth of tokens, so nothing goes out for BACKOFF_WINDOW seconds
+            self._tokens = min(self._tokens, -self.rate * BACKOFF_WINDOW)
+            return self.rate
@@ -0,0 +1,87 @@
+"""
+Recipients Module
+Streaming reader for certificate rosters (recipients.txt) and certificate file naming,
+shared by certificate generation, the certificate registry and the email sender
+"""
+
+import csv
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+
+def _print_line_error(line_num: int, message: str):
+    """Default per-line error handler: print a warning"""
+    print(f"⚠️  Warning: {message} (line {line_num})")
+
+
+def iter_recipients(recipients_file: str,
+                    on_error: Optional[Callable[[int, str], None]] = None) -> Iterator[Dict[str, str]]:
+    """
+    Lazily yield recipients from a "Name,Course" roster file
+    
+    Lines are parsed as CSV, so names or courses containing commas can be quoted
+    ("Smith, John",Python Workshop). Blank lines and lines starting with '#' are
+    skipped. Only the current line is held in memory.
+    
+    Args:
+        recipients_file: Path to the roster file
+        on_error: Called as on_error(line_num, message) for each invalid line
+            (default: print a warning)
+    
+    Yields:
+        Dictionaries with 'name', 'course' and 'line' (1-based line number)
+    
+    Raises:
+        FileNotFoundError: If the roster file does not exist
+    """
+    if on_error is None:
+        on_error = _print_line_error
+    
+    with open(recipients_file, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f, skipinitialspace=True)
+        next_line = 1
+        while True:
+            # A quoted field may span lines, so track where each record starts
+            line_num = next_line
+            try:
+                row = next(reader)
+            except StopIteration:
+                break
+            except csv.Error as e:
+                on_error(line_num, f"Could not parse line in {recipients_file}: {e}")
+                next_line = reader.line_num + 1
+                continue
+            next_line = reader.line_num + 1
+            
+            # Skip empty lines and comments
+            if not row or not ''.join(row).strip() or row[0].lstrip().startswith('#'):
+                continue
+            
+            name = row[0].strip()
+            course = row[1].strip() if len(row) >= 2 else ''
+            if not name or not course:
+                on_error(line_num, f"Invalid format in {recipients_file}. Expected format: Name,Course")
+                continue
+            
+            yield {'name': name, 'course': course, 'line': line_num}
+
+
+def certificate_filename(name: str, course: Optional[str] = None) -> str:
+    """
+    Create a safe, deterministic output filename from a recipient name (and course, so
+    one person's certificates for different courses don't overwrite each other)
+    """
+    parts = [name] if course is None else [name, course]
+    safe_parts = ["".join(c for c in part if c.isalnum() or c in (' ', '-', '_')).strip().replace(' ', '_')
+                  for part in parts]
+    return f"{'_'.join(safe_parts)}_certificate.pdf"
+
+
+def iter_chunks(items: Iterable, chunk_size: int) -> Iterator[List]:
+    """Group an iterable into lists of at most chunk_size items"""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
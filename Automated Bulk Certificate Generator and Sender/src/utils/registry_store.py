@@ -0,0 +1,804 @@
+"""
+Registry Store Module
+Storage backends for the certificate registry
+"""
+
+import json
+import os
+import pickle
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    from .file_lock import FileLock, file_stamp
+except ImportError:
+    # Fallback for when utils is on sys.path directly
+    from file_lock import FileLock, file_stamp
+
+
+REGISTRY_VERSION = "1.0"
+
+# Work stages tracked per record: pending kind -> status flag that marks it done
+STATUS_FLAGS = {"pdf": "pdf_generated", "email": "email_sent", "api": "api_registered"}
+
+# Layout of the binary snapshot cache; a cache in any other format is ignored
+CACHE_FORMAT = 2
+
+
+def _new_registry_data() -> Dict:
+    """Empty registry in the certificate_registry.json format"""
+    now = datetime.now().isoformat()
+    return {
+        "certificates": {},
+        "metadata": {
+            "created": now,
+            "last_updated": now,
+            "version": REGISTRY_VERSION
+        }
+    }
+
+
+class JsonJournalStore:
+    """
+    Certificate records kept in a JSON snapshot plus an append-only journal of changes
+    
+    Every change is appended to the journal as one JSON line instead of rewriting the
+    whole registry. On load the snapshot (certificate_registry.json, in the same format
+    as always) is read and the journal entries written after it are replayed. When the
+    journal outgrows the registry it is compacted into a new snapshot, so the bytes
+    written stay proportional to the number of changes, and close() folds whatever is
+    left in the journal into the snapshot at the end of a run, so certificate_registry.json
+    is current for anything that reads it directly. Records are also indexed in
+    memory by certificate ID, by normalized name and by pending work (no PDF, email or
+    API push yet).
+    
+    Parsing a large snapshot dominates startup, so the parsed registry and its indexes
+    are also pickled to certificate_registry.cache, tagged with the snapshot's
+    file_stamp(). A load uses the cache when the stamp still matches and falls back to
+    the JSON (rewriting the cache) otherwise; the JSON stays the source of truth. The
+    cache starts with a small header holding the status counts, so cached_status_counts()
+    can report them without loading the records.
+    
+    Several processes can share the files: every read or write of them happens under
+    an advisory lock on certificate_registry.lock, and before changing anything the
+    store first replays what other processes appended. Changes are journaled as
+    operations (put, field update, delete), so concurrent updates to different fields
+    of a record merge instead of overwriting each other, and batch() makes a group of
+    reads and writes atomic. Threads share one store through an in-process lock.
+    """
+    
+    # Compact once the journal has more entries than this and than there are records
+    COMPACT_MIN_ENTRIES = 1000
+    
+    def __init__(self, snapshot_file: str, journal_file: str = None):
+        self.snapshot_file = snapshot_file
+        self.journal_file = journal_file or f"{os.path.splitext(snapshot_file)[0]}.journal"
+        self.cache_file = f"{os.path.splitext(snapshot_file)[0]}.cache"
+        
+        self.certificates: Dict[str, Dict] = {}
+        self.metadata: Dict = {}
+        self._by_certificate_id: Dict[str, str] = {}  # certificate_id -> record key
+        self._by_name: Dict[str, List[str]] = {}  # normalized name -> record keys, oldest first
+        # Pending kind -> keys of records whose flag is still false (dicts as ordered sets)
+        self._pending: Dict[str, Dict[str, None]] = {kind: {} for kind in STATUS_FLAGS}
+        self._seq = 0  # Sequence number of the last journal entry applied
+        self._journal_entries = 0
+        self._journal_offset = 0  # Bytes of the journal applied so far
+        self._snapshot_stamp = None  # file_stamp() of the snapshot loaded
+        self._batch_entries: Optional[List[Dict]] = None  # Entries held back by batch()
+        
+        self.lock_file = f"{os.path.splitext(snapshot_file)[0]}.lock"
+        self._lock = threading.RLock()  # Threads of this process
+        self._file_lock = FileLock(self.lock_file)  # Other processes
+        
+        with self._file_lock:
+            self._load()
+    
+    def _load(self):
+        """Read the snapshot and replay the journal on top of it (call with the file lock held)"""
+        self._snapshot_stamp = file_stamp(self.snapshot_file)
+        if not self._load_cache():
+            data = None
+            if self._snapshot_stamp is not None:
+                try:
+                    with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                except Exception as e:
+                    print(f"⚠️  Warning: Could not load registry: {e}")
+            parsed = data is not None
+            if data is None:
+                data = _new_registry_data()
+            
+            self.certificates = data.get("certificates", {})
+            self.metadata = data.get("metadata", {})
+            self._by_certificate_id = {}
+            self._by_name = {}
+            self._pending = {kind: {} for kind in STATUS_FLAGS}
+            for key, record in self.certificates.items():
+                self._index(key, record)
+            if parsed:
+                self._write_cache()
+        
+        self._seq = self.metadata.get("journal_seq", 0)
+        self._journal_entries = 0
+        self._journal_offset = 0
+        self._replay_journal()
+    
+    def _load_cache(self) -> bool:
+        """Load the snapshot's state from the binary cache if it matches the snapshot"""
+        if self._snapshot_stamp is None or not os.path.exists(self.cache_file):
+            return False
+        try:
+            with open(self.cache_file, 'rb') as f:
+                header = pickle.load(f)
+                if header.get("format") != CACHE_FORMAT or tuple(header["snapshot"]) != self._snapshot_stamp:
+                    return False
+                cache = pickle.load(f)
+        except Exception:
+            # Unreadable or from another version: rebuilt from the JSON
+            return False
+        
+        self.certificates = cache["certificates"]
+        self.metadata = cache["metadata"]
+        self._by_certificate_id = cache["by_certificate_id"]
+        self._by_name = cache["by_name"]
+        self._pending = cache["pending"]
+        return True
+    
+    def _write_cache(self):
+        """Pickle the in-memory state, which must match the snapshot on disk (file lock held)"""
+        temp_path = f"{self.cache_file}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                pickle.dump({
+                    "format": CACHE_FORMAT,
+                    "snapshot": self._snapshot_stamp,
+                    "status_counts": self.status_counts(),
+                }, f, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump({
+                    "certificates": self.certificates,
+                    "metadata": self.metadata,
+                    "by_certificate_id": self._by_certificate_id,
+                    "by_name": self._by_name,
+                    "pending": self._pending,
+                }, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.cache_file)
+        except Exception as e:
+            print(f"⚠️  Warning: Could not write registry cache: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    
+    @staticmethod
+    def cached_status_counts(snapshot_file: str, journal_file: str = None) -> Optional[Dict[str, int]]:
+        """
+        Status counts read from the cache header, without loading the registry
+        
+        Returns None when they may be out of date: the cache doesn't match the snapshot,
+        or the journal holds changes not yet compacted into it (e.g. during a run).
+        """
+        base = os.path.splitext(snapshot_file)[0]
+        journal_file = journal_file or f"{base}.journal"
+        with FileLock(f"{base}.lock"):
+            journal_stamp = file_stamp(journal_file)
+            if journal_stamp is not None and journal_stamp[2] > 0:
+                return None
+            snapshot_stamp = file_stamp(snapshot_file)
+            try:
+                with open(f"{base}.cache", 'rb') as f:
+                    header = pickle.load(f)
+            except Exception:
+                return None
+        if header.get("format") != CACHE_FORMAT or snapshot_stamp is None or \
+                tuple(header["snapshot"]) != snapshot_stamp:
+            return None
+        return dict(header["status_counts"])
+    
+    def _replay_journal(self):
+        """Apply journal entries newer than the snapshot, from where the last replay stopped"""
+        if not os.path.exists(self.journal_file):
+            return
+        
+        with open(self.journal_file, 'rb') as f:
+            f.seek(self._journal_offset)
+            offset = self._journal_offset
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    if line.endswith(b'\n'):
+                        print(f"⚠️  Warning: Skipping unreadable registry journal entry at byte {offset}")
+                        offset += len(line)
+                        continue
+                    # A torn final line from an interrupted write (writers hold the lock,
+                    # so nobody is still writing it): drop it
+                    print("⚠️  Warning: Discarding incomplete last registry journal entry")
+                    f.close()
+                    with open(self.journal_file, 'r+b') as journal:
+                        journal.truncate(offset)
+                    break
+                
+                offset += len(line)
+                self._journal_entries += 1
+                if entry.get("seq", 0) > self._seq:
+                    self._apply(entry)
+        self._journal_offset = offset
+    
+    def _disk_changed(self) -> bool:
+        """Whether another process has written the snapshot or journal since we last read them"""
+        if file_stamp(self.snapshot_file) != self._snapshot_stamp:
+            return True
+        journal_stamp = file_stamp(self.journal_file)
+        return (journal_stamp[2] if journal_stamp else 0) != self._journal_offset
+    
+    def _catch_up(self):
+        """Apply what other processes wrote (call with the file lock held)"""
+        if not self._disk_changed():
+            return
+        journal_stamp = file_stamp(self.journal_file)
+        if file_stamp(self.snapshot_file) != self._snapshot_stamp or \
+                (journal_stamp[2] if journal_stamp else 0) < self._journal_offset:
+            # Compacted by someone else: start over from the new snapshot
+            self._load()
+        else:
+            self._replay_journal()
+    
+    def refresh(self):
+        """Pick up changes other processes made since the last read or write"""
+        with self._lock:
+            if self._batch_entries is None:
+                with self._file_lock:
+                    self._catch_up()
+    
+    def _apply(self, entry: Dict):
+        """Apply one journal entry to the in-memory registry"""
+        op = entry["op"]
+        if op == "put":
+            key = entry["key"]
+            previous = self.certificates.get(key)
+            if previous is not None:
+                self._unindex(key, previous)
+            self.certificates[key] = entry["record"]
+            self._index(key, entry["record"])
+        elif op == "update":
+            key = entry["key"]
+            record = self.certificates.get(key)
+            if record is not None:
+                fields = entry["fields"]
+                if "certificate_id" in fields or "name" in fields:
+                    self._unindex(key, record)
+                    record.update(fields)
+                    self._index(key, record)
+                elif any(flag in fields for flag in STATUS_FLAGS.values()):
+                    self._unindex_status(key)
+                    record.update(fields)
+                    self._index_status(key, record)
+                else:
+                    record.update(fields)
+        elif op == "delete":
+            record = self.certificates.pop(entry["key"], None)
+            if record is not None:
+                self._unindex(entry["key"], record)
+        elif op == "meta":
+            self.metadata.update(entry["fields"])
+        
+        self._seq = entry["seq"]
+        self.metadata["last_updated"] = entry.get("time", self.metadata.get("last_updated"))
+    
+    def _index(self, key: str, record: Dict):
+        cert_id = record.get("certificate_id")
+        if cert_id:
+            self._by_certificate_id[cert_id] = key
+        self._by_name.setdefault(record.get("name", "").strip().lower(), []).append(key)
+        self._index_status(key, record)
+    
+    def _index_status(self, key: str, record: Dict):
+        for kind, flag in STATUS_FLAGS.items():
+            if not record.get(flag):
+                self._pending[kind][key] = None
+    
+    def _unindex_status(self, key: str):
+        for pending in self._pending.values():
+            pending.pop(key, None)
+    
+    def _unindex(self, key: str, record: Dict):
+        cert_id = record.get("certificate_id")
+        if cert_id and self._by_certificate_id.get(cert_id) == key:
+            del self._by_certificate_id[cert_id]
+        name_key = record.get("name", "").strip().lower()
+        keys = self._by_name.get(name_key)
+        if keys and key in keys:
+            keys.remove(key)
+            if not keys:
+                del self._by_name[name_key]
+        self._unindex_status(key)
+    
+    @contextmanager
+    def _writing(self):
+        """Hold the locks for a change; outside a batch, first merge what other processes wrote"""
+        with self._lock:
+            if self._batch_entries is not None:
+                yield
+                return
+            with self._file_lock:
+                self._catch_up()
+                yield
+    
+    def _append(self, entries: List[Dict]):
+        """Apply entries and append them to the journal in a single write (call inside _writing())"""
+        now = datetime.now().isoformat()
+        for entry in entries:
+            entry["seq"] = self._seq + 1
+            entry["time"] = now
+            self._apply(entry)
+        
+        if self._batch_entries is not None:
+            self._batch_entries.extend(entries)
+        else:
+            self._write_entries(entries)
+    
+    def _write_entries(self, entries: List[Dict]):
+        """Append entries to the journal with a single write and compact when the journal is large"""
+        data = ''.join(json.dumps(entry, ensure_ascii=False) + '\n' for entry in entries).encode('utf-8')
+        try:
+            with open(self.journal_file, 'ab') as f:
+                f.write(data)
+                self._journal_offset = f.tell()
+        except Exception as e:
+            print(f"⚠️  Warning: Could not save registry: {e}")
+            return
+        
+        self._journal_entries += len(entries)
+        if self._journal_entries > max(self.COMPACT_MIN_ENTRIES, len(self.certificates)):
+            self.compact()
+    
+    @contextmanager
+    def batch(self):
+        """
+        Group changes into one journal write
+        
+        Changes are visible immediately but only written when the outermost batch
+        exits. Like a database transaction, the batch starts from the latest data on disk
+        and holds the locks until it ends, so other threads and processes wait for it
+        and reads inside it stay current. If the block raises, the changes are discarded
+        and the registry is reloaded.
+        """
+        with self._lock, self._file_lock:
+            if self._batch_entries is not None:
+                yield
+                return
+            
+            self._catch_up()
+            self._batch_entries = []
+            try:
+                yield
+            except BaseException:
+                self._batch_entries = None
+                self._load()
+                raise
+            
+            entries, self._batch_entries = self._batch_entries, None
+            if entries:
+                self._write_entries(entries)
+    
+    def get(self, key: str) -> Optional[Dict]:
+        return self.certificates.get(key)
+    
+    def get_by_certificate_id(self, cert_id: str) -> Optional[Dict]:
+        key = self._by_certificate_id.get(cert_id)
+        return self.certificates.get(key) if key is not None else None
+    
+    def get_by_name(self, name_key: str) -> List[Dict]:
+        """Records for a normalized name, oldest first"""
+        with self._lock:
+            return [self.certificates[key] for key in self._by_name.get(name_key, ())]
+    
+    def put(self, key: str, record: Dict):
+        """Insert or replace a record"""
+        self.put_many([(key, record)])
+    
+    def put_many(self, items: Iterable[Tuple[str, Dict]]):
+        """Insert or replace many records with one journal write"""
+        entries = [{"op": "put", "key": key, "record": record} for key, record in items]
+        if entries:
+            with self._writing():
+                self._append(entries)
+    
+    def delete_many(self, keys: Iterable[str]):
+        """Remove records (missing keys are ignored) with one journal write"""
+        keys = list(keys)
+        with self._writing():
+            entries = [{"op": "delete", "key": key} for key in keys if key in self.certificates]
+            if entries:
+                self._append(entries)
+    
+    def update(self, key: str, fields: Dict) -> bool:
+        """Update fields of an existing record; returns False if there is no such record"""
+        with self._writing():
+            if key not in self.certificates:
+                return False
+            self._append([{"op": "update", "key": key, "fields": fields}])
+        return True
+    
+    def set_metadata(self, **fields):
+        with self._writing():
+            self._append([{"op": "meta", "fields": fields}])
+    
+    def status_counts(self) -> Dict[str, int]:
+        """Number of records in total and with each status flag set"""
+        with self._lock:
+            total = len(self.certificates)
+            counts = {"total": total}
+            for kind, flag in STATUS_FLAGS.items():
+                counts[flag] = total - len(self._pending[kind])
+        return counts
+    
+    def pending(self, kind: str, limit: Optional[int] = None) -> Iterator[Dict]:
+        """Records whose status flag for kind is false, in the order they became pending"""
+        with self._lock:
+            records = [self.certificates[key] for key in islice(self._pending[kind], limit)]
+        return iter(records)
+    
+    def registered_since(self, registry_seq: int) -> Iterator[Dict]:
+        """Records whose registry_seq is greater than the given one, in registration order"""
+        with self._lock:
+            records = [record for record in self.certificates.values()
+                       if record.get("registry_seq", 0) > registry_seq]
+        return iter(sorted(records, key=lambda record: record["registry_seq"]))
+    
+    def items(self) -> Iterator[Tuple[str, Dict]]:
+        with self._lock:
+            return iter(list(self.certificates.items()))
+    
+    def records(self) -> Iterator[Dict]:
+        with self._lock:
+            return iter(list(self.certificates.values()))
+    
+    def __len__(self) -> int:
+        return len(self.certificates)
+    
+    def _data(self) -> Dict:
+        return {"certificates": self.certificates, "metadata": self.metadata}
+    
+    def export_json(self, path: str):
+        """Write the whole registry as an indented JSON file (certificate_registry.json format)"""
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with self._lock:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._data(), f, indent=2, ensure_ascii=False)
+        os.replace(temp_path, path)
+    
+    def compact(self):
+        """Fold the journal into a new snapshot and empty the journal"""
+        with self._lock:
+            if self._batch_entries is not None:
+                return
+            with self._file_lock:
+                self._catch_up()
+                self.metadata["journal_seq"] = self._seq
+                try:
+                    self.export_json(self.snapshot_file)
+                    # Entries up to journal_seq are in the snapshot, so a crash before this
+                    # truncate only leaves entries that the next load skips
+                    open(self.journal_file, 'w').close()
+                    self._journal_entries = 0
+                    self._journal_offset = 0
+                    self._snapshot_stamp = file_stamp(self.snapshot_file)
+                    self._write_cache()
+                except Exception as e:
+                    print(f"⚠️  Warning: Could not compact registry: {e}")
+    
+    def close(self):
+        """Compact if the journal holds changes (ours or another process's), so the snapshot is current"""
+        with self._lock:
+            if self._batch_entries is None and (self._journal_entries or self._disk_changed()):
+                self.compact()
+
+
+def _index_columns(record: Dict) -> Tuple:
+    """Values of the indexed SQLite columns for a record"""
+    return (record.get("certificate_id"),
+            record.get("name", "").strip().lower(),
+            record.get("course"),
+            int(bool(record.get("email_sent"))),
+            int(bool(record.get("api_registered"))),
+            int(bool(record.get("pdf_generated"))),
+            record.get("registry_seq", 0))
+
+
+class SQLiteStore:
+    """
+    Certificate records in a SQLite database
+    
+    Each record is stored as JSON next to indexed columns for the certificate ID,
+    normalized name, course and the PDF/email/API status flags. Triggers keep per-status
+    counters in the status_counts table. The database runs in WAL mode, so readers never
+    block the writer, and batch() wraps many changes in one transaction. Processes
+    sharing the database take turns through SQLite's own locking (writes start with
+    BEGIN IMMEDIATE, so a read-modify-write always sees the latest record); threads
+    share the connection through an in-process lock.
+    """
+    
+    ITEMS_PAGE_SIZE = 1000
+    
+    TABLES = """
+        CREATE TABLE IF NOT EXISTS certificates (
+            key TEXT PRIMARY KEY,
+            certificate_id TEXT,
+            name_key TEXT,
+            course TEXT,
+            email_sent INTEGER NOT NULL DEFAULT 0,
+            api_registered INTEGER NOT NULL DEFAULT 0,
+            record TEXT NOT NULL,
+            pdf_generated INTEGER NOT NULL DEFAULT 0,
+            registry_seq INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS metadata (
+            name TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS status_counts (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+    """
+    
+    INDEXES = """
+        CREATE INDEX IF NOT EXISTS idx_certificates_certificate_id ON certificates (certificate_id);
+        CREATE INDEX IF NOT EXISTS idx_certificates_name_key ON certificates (name_key);
+        CREATE INDEX IF NOT EXISTS idx_certificates_course ON certificates (course);
+        CREATE INDEX IF NOT EXISTS idx_certificates_email_sent ON certificates (email_sent);
+        CREATE INDEX IF NOT EXISTS idx_certificates_api_registered ON certificates (api_registered);
+        CREATE INDEX IF NOT EXISTS idx_certificates_pdf_generated ON certificates (pdf_generated);
+        CREATE INDEX IF NOT EXISTS idx_certificates_registry_seq ON certificates (registry_seq);
+        
+        CREATE TRIGGER IF NOT EXISTS certificates_count_insert AFTER INSERT ON certificates BEGIN
+            UPDATE status_counts SET value = value + CASE name
+                WHEN 'total' THEN 1
+                WHEN 'pdf_generated' THEN NEW.pdf_generated
+                WHEN 'email_sent' THEN NEW.email_sent
+                WHEN 'api_registered' THEN NEW.api_registered ELSE 0 END;
+        END;
+        CREATE TRIGGER IF NOT EXISTS certificates_count_delete AFTER DELETE ON certificates BEGIN
+            UPDATE status_counts SET value = value - CASE name
+                WHEN 'total' THEN 1
+                WHEN 'pdf_generated' THEN OLD.pdf_generated
+                WHEN 'email_sent' THEN OLD.email_sent
+                WHEN 'api_registered' THEN OLD.api_registered ELSE 0 END;
+        END;
+        CREATE TRIGGER IF NOT EXISTS certificates_count_update
+        AFTER UPDATE OF pdf_generated, email_sent, api_registered ON certificates BEGIN
+            UPDATE status_counts SET value = value + CASE name
+                WHEN 'pdf_generated' THEN NEW.pdf_generated - OLD.pdf_generated
+                WHEN 'email_sent' THEN NEW.email_sent - OLD.email_sent
+                WHEN 'api_registered' THEN NEW.api_registered - OLD.api_registered ELSE 0 END;
+        END;
+    """
+    
+    def __init__(self, db_file: str):
+        self.db_file = db_file
+        # Autocommit mode: single changes commit at once, batch() opens explicit transactions
+        self._conn = sqlite3.connect(db_file, timeout=30, isolation_level=None, check_same_thread=False)
+        self._lock = threading.RLock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # INSERT OR REPLACE only fires the delete trigger for the replaced row with this on
+        self._conn.execute("PRAGMA recursive_triggers=ON")
+        self._batch_depth = 0
+        
+        self._conn.executescript(self.TABLES)
+        self._upgrade_schema()
+        self._conn.executescript(self.INDEXES)
+        with self.batch():
+            if self._conn.execute("SELECT COUNT(*) FROM status_counts").fetchone()[0] == 0:
+                self._conn.execute(
+                    "INSERT INTO status_counts (name, value) "
+                    "SELECT 'total', COUNT(*) FROM certificates "
+                    "UNION ALL SELECT 'pdf_generated', COALESCE(SUM(pdf_generated), 0) FROM certificates "
+                    "UNION ALL SELECT 'email_sent', COALESCE(SUM(email_sent), 0) FROM certificates "
+                    "UNION ALL SELECT 'api_registered', COALESCE(SUM(api_registered), 0) FROM certificates")
+        
+        if not self.metadata:
+            now = datetime.now().isoformat()
+            self.set_metadata(created=now, last_updated=now, version=REGISTRY_VERSION)
+    
+    def _upgrade_schema(self):
+        """Add columns introduced after a database was created"""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(certificates)")}
+        added = [column for column in ("pdf_generated", "registry_seq") if column not in columns]
+        if added:
+            with self.batch():
+                for column in added:
+                    self._conn.execute(f"ALTER TABLE certificates ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0")
+                self._conn.executemany(
+                    "UPDATE certificates SET pdf_generated = ?, registry_seq = ? WHERE key = ?",
+                    (_index_columns(json.loads(record))[5:] + (key,)
+                     for key, record in self._conn.execute("SELECT key, record FROM certificates").fetchall()))
+    
+    @contextmanager
+    def batch(self):
+        """
+        Run a group of changes in one transaction (rolled back if the block raises)
+        
+        Other threads wait for the transaction to finish; other processes wait up to the
+        connection timeout for the database write lock.
+        """
+        with self._lock:
+            if self._batch_depth:
+                self._batch_depth += 1
+                try:
+                    yield
+                finally:
+                    self._batch_depth -= 1
+                return
+            
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._batch_depth = 1
+            try:
+                yield
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._conn.execute("COMMIT")
+            finally:
+                self._batch_depth = 0
+    
+    def _query(self, sql: str, parameters=()) -> List[Tuple]:
+        """Run a read-only query and fetch all rows"""
+        with self._lock:
+            return self._conn.execute(sql, parameters).fetchall()
+    
+    def refresh(self):
+        """Nothing to do: every query reads the latest committed data"""
+    
+    def _touch(self):
+        self._conn.execute("INSERT OR REPLACE INTO metadata (name, value) VALUES ('last_updated', ?)",
+                           (json.dumps(datetime.now().isoformat()),))
+    
+    def get(self, key: str) -> Optional[Dict]:
+        rows = self._query("SELECT record FROM certificates WHERE key = ?", (key,))
+        return json.loads(rows[0][0]) if rows else None
+    
+    def get_by_certificate_id(self, cert_id: str) -> Optional[Dict]:
+        rows = self._query("SELECT record FROM certificates WHERE certificate_id = ? "
+                           "ORDER BY rowid DESC LIMIT 1", (cert_id,))
+        return json.loads(rows[0][0]) if rows else None
+    
+    def get_by_name(self, name_key: str) -> List[Dict]:
+        """Records for a normalized name, oldest first"""
+        return [json.loads(record) for record, in self._query(
+            "SELECT record FROM certificates WHERE name_key = ? ORDER BY rowid", (name_key,))]
+    
+    def put(self, key: str, record: Dict):
+        """Insert or replace a record"""
+        self.put_many([(key, record)])
+    
+    def put_many(self, items: Iterable[Tuple[str, Dict]]):
+        """Insert or replace many records in one transaction"""
+        with self.batch():
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO certificates "
+                "(key, certificate_id, name_key, course, email_sent, api_registered, pdf_generated, "
+                "registry_seq, record) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                ((key,) + _index_columns(record) + (json.dumps(record, ensure_ascii=False),)
+                 for key, record in items))
+            self._touch()
+    
+    def delete_many(self, keys: Iterable[str]):
+        """Remove records (missing keys are ignored) in one transaction"""
+        with self.batch():
+            self._conn.executemany("DELETE FROM certificates WHERE key = ?", ((key,) for key in keys))
+            self._touch()
+    
+    def update(self, key: str, fields: Dict) -> bool:
+        """Update fields of an existing record; returns False if there is no such record"""
+        with self.batch():
+            record = self.get(key)
+            if record is None:
+                return False
+            record.update(fields)
+            self._conn.execute(
+                "UPDATE certificates SET certificate_id = ?, name_key = ?, course = ?, "
+                "email_sent = ?, api_registered = ?, pdf_generated = ?, registry_seq = ?, record = ? "
+                "WHERE key = ?",
+                _index_columns(record) + (json.dumps(record, ensure_ascii=False), key))
+            self._touch()
+        return True
+    
+    @property
+    def metadata(self) -> Dict:
+        return {name: json.loads(value)
+                for name, value in self._query("SELECT name, value FROM metadata")}
+    
+    def set_metadata(self, **fields):
+        with self.batch():
+            self._conn.executemany("INSERT OR REPLACE INTO metadata (name, value) VALUES (?, ?)",
+                                   ((name, json.dumps(value)) for name, value in fields.items()))
+    
+    def items(self) -> Iterator[Tuple[str, Dict]]:
+        # Fetched a page at a time so the lock isn't held while the caller works
+        last_rowid = 0
+        while True:
+            rows = self._query("SELECT rowid, key, record FROM certificates WHERE rowid > ? "
+                               "ORDER BY rowid LIMIT ?", (last_rowid, self.ITEMS_PAGE_SIZE))
+            for last_rowid, key, record in rows:
+                yield key, json.loads(record)
+            if len(rows) < self.ITEMS_PAGE_SIZE:
+                return
+    
+    def records(self) -> Iterator[Dict]:
+        return (record for _, record in self.items())
+    
+    def status_counts(self) -> Dict[str, int]:
+        """Number of records in total and with each status flag set (trigger-maintained)"""
+        return dict(self._query("SELECT name, value FROM status_counts"))
+    
+    def pending(self, kind: str, limit: Optional[int] = None) -> Iterator[Dict]:
+        """Records whose status flag for kind is false, oldest first"""
+        rows = self._query(f"SELECT record FROM certificates WHERE {STATUS_FLAGS[kind]} = 0 "
+                           f"ORDER BY rowid LIMIT ?", (-1 if limit is None else limit,))
+        return (json.loads(record) for record, in rows)
+    
+    def registered_since(self, registry_seq: int) -> Iterator[Dict]:
+        """Records whose registry_seq is greater than the given one, in registration order"""
+        rows = self._query("SELECT record FROM certificates WHERE registry_seq > ? "
+                           "ORDER BY registry_seq", (registry_seq,))
+        return (json.loads(record) for record, in rows)
+    
+    def __len__(self) -> int:
+        return self.status_counts()["total"]
+    
+    def export_json(self, path: str):
+        """Write the whole registry as an indented JSON file (certificate_registry.json format)"""
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            # Streamed record by record; same layout as json.dump(..., indent=2)
+            f.write('{\n  "certificates": {')
+            separator = '\n    '
+            for key, record in self.items():
+                f.write(separator + json.dumps(key, ensure_ascii=False) + ': '
+                        + json.dumps(record, indent=2, ensure_ascii=False).replace('\n', '\n    '))
+                separator = ',\n    '
+            f.write('\n  },' if separator != '\n    ' else '},')
+            f.write('\n  "metadata": '
+                    + json.dumps(self.metadata, indent=2, ensure_ascii=False).replace('\n', '\n  ')
+                    + '\n}')
+        os.replace(temp_path, path)
+    
+    def compact(self):
+        """Checkpoint the write-ahead log into the database file"""
+        with self._lock:
+            if not self._batch_depth:
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def migrate_json_to_sqlite(snapshot_file: str, journal_file: str, db_file: str) -> int:
+    """
+    Copy a JSON (snapshot + journal) registry into a SQLite database
+    
+    Records already in the database are replaced. The JSON files are left untouched.
+    
+    Returns:
+        Number of records migrated
+    """
+    source = JsonJournalStore(snapshot_file, journal_file)
+    target = SQLiteStore(db_file)
+    try:
+        with target.batch():
+            target.put_many(source.certificates.items())
+            # journal_seq carries over so a JSON export of the database skips the old journal
+            metadata = dict(source.metadata, journal_seq=source._seq)
+            metadata["migrated_from"] = os.path.basename(snapshot_file)
+            metadata["migrated_at"] = datetime.now().isoformat()
+            target.set_metadata(**metadata)
+        return len(source)
+    finally:
+        target.close()
@@ -0,0 +1,259 @@
+"""
+Send Scheduler Module
+Persistent email queue that keeps each sending account within its daily limit: sends
+are counted over a rolling 24-hour window and whatever doesn't fit waits for the next
+window, even across restarts
+"""
+
+import json
+import os
+import smtplib
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    from .file_lock import FileLock
+except ImportError:
+    # Fallback for when utils is on sys.path directly
+    from file_lock import FileLock
+
+# Length of the rolling window daily limits are counted over, in seconds
+DAY = 24 * 60 * 60
+
+# Seconds to wait before trying again after the server reports the quota used up
+# (it also counts mail sent outside this tool, so the window can't be predicted)
+QUOTA_RETRY_DELAY = 60 * 60
+
+# Words providers use in "daily sending quota exceeded" replies
+# (Gmail: 550 5.4.5 Daily user sending limit exceeded)
+QUOTA_MARKERS = (b"quota", b"sending limit", b"5.4.5")
+
+
+def is_quota_error(error: Exception) -> bool:
+    """Whether an SMTP error says the account's sending quota is used up"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        replies = [message for _, message in error.recipients.values()]
+    elif isinstance(error, smtplib.SMTPResponseException):
+        replies = [error.smtp_error]
+    else:
+        return False
+    for message in replies:
+        if isinstance(message, str):
+            message = message.encode('utf-8', 'replace')
+        if any(marker in message.lower() for marker in QUOTA_MARKERS):
+            return True
+    return False
+
+
+def format_time(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M')
+
+
+class SendScheduler:
+    """
+    Queue of recipients plus the send times of each account over the last window
+    
+    A queued recipient may name the account that sends it ('account'); each account
+    has its own limit and is only given its own recipients. The state lives in a JSON
+    file, so a job that was stopped (or is waiting for the next window) carries on
+    where it left off when it is run again. While the scheduler is open it holds a
+    lock file, so a second process waits instead of sending the same queue twice.
+    
+    Usage:
+        with SendScheduler("data/emails/send_queue.json", daily_limit=500) as scheduler:
+            scheduler.enqueue(recipients, job)
+            for batch in scheduler.batches([account]):
+                for entry_id, recipient in batch:
+                    ...
+                    scheduler.record_sent(account, entry_id)
+    """
+    
+    def __init__(self, path: str, daily_limit: int, window: float = DAY,
+                 account_limits: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            path: JSON state file
+            daily_limit: Emails an account may send per window
+            window: Length of the window in seconds
+            account_limits: Limits of accounts that differ from daily_limit
+        """
+        account_limits = account_limits or {}
+        for limit in [daily_limit, *account_limits.values()]:
+            if limit < 1:
+                raise ValueError(f"Daily limit must be at least 1, got {limit}")
+        
+        self.path = path
+        self.daily_limit = daily_limit
+        self.account_limits = dict(account_limits)
+        self.window = window
+        self._file_lock = FileLock(f"{path}.lock")
+        self.job: Optional[Dict] = None
+        self.queue: Dict[str, Dict] = {}
+        self.accounts: Dict[str, Dict] = {}
+        self.next_id = 0
+    
+    def __enter__(self):
+        self._file_lock.acquire()
+        try:
+            self.load()
+        except BaseException:
+            self._file_lock.release()
+            raise
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            self.save()
+        finally:
+            self._file_lock.release()
+    
+    def load(self):
+        """Read the queue and send history from the state file, if there is one"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.job = data.get("job")
+        self.queue = data.get("queue", {})
+        self.accounts = data.get("accounts", {})
+        self.next_id = data.get("next_id", 0)
+    
+    def save(self):
+        """Write the state file atomically, dropping sends that have left the window"""
+        cutoff = time.time() - self.window
+        for state in self.accounts.values():
+            state["sent"] = [t for t in state["sent"] if t > cutoff]
+        
+        data = {"job": self.job if self.queue else None, "queue": self.queue,
+                "accounts": self.accounts, "next_id": self.next_id}
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+    
+    def enqueue(self, recipients: Iterable[Dict], job: Dict) -> int:
+        """
+        Queue recipients for a job, unless an unfinished job is still queued
+        
+        Args:
+            recipients: Recipient dicts (at least 'email')
+            job: What is being sent (e.g. email list and subject), to recognise a rerun
+        
+        Returns:
+            Number of recipients queued now (0 when resuming the same job)
+        
+        Raises:
+            ValueError: If the queue still holds emails for a different job
+        """
+        if self.queue:
+            if self.job != job:
+                raise ValueError(f"Send queue {self.path} still holds {len(self.queue)} emails for "
+                                 f"{self.job}; run that job again to finish it, or delete the file")
+            return 0
+        
+        self.job = job
+        for recipient in recipients:
+            self.queue[str(self.next_id)] = recipient
+            self.next_id += 1
+        self.save()
+        return len(self.queue)
+    
+    def _account(self, account: str) -> Dict:
+        return self.accounts.setdefault(account, {"sent": [], "blocked_until": 0})
+    
+    def _recent_sends(self, account: str, now: float) -> List[float]:
+        return sorted(t for t in self._account(account)["sent"] if t > now - self.window)
+    
+    def limit(self, account: str) -> int:
+        return self.account_limits.get(account, self.daily_limit)
+    
+    def pending(self, account: str) -> List[Tuple[str, Dict]]:
+        """Queued (entry ID, recipient) pairs the account is to send"""
+        return [(entry_id, recipient) for entry_id, recipient in self.queue.items()
+                if recipient.get("account", account) == account]
+    
+    def remaining(self, account: str) -> int:
+        """Emails the account may still send in the current window"""
+        now = time.time()
+        if self._account(account)["blocked_until"] > now:
+            return 0
+        return max(0, self.limit(account) - len(self._recent_sends(account, now)))
+    
+    def plan(self, account: str) -> List[Tuple[float, int]]:
+        """
+        Earliest start of each window the queue needs, as (time, emails) pairs
+        
+        Every queued email is given the first moment the rolling window has room for it;
+        emails are then grouped into windows starting a day apart.
+        """
+        now = time.time()
+        limit = self.limit(account)
+        blocked_until = self._account(account)["blocked_until"]
+        sends = self._recent_sends(account, now)
+        windows: List[Tuple[float, int]] = []
+        for _ in range(len(self.pending(account))):
+            earliest = max(now, blocked_until)
+            if len(sends) >= limit:
+                earliest = max(earliest, sends[-limit] + self.window)
+            sends.append(earliest)
+            if windows and earliest < windows[-1][0] + self.window:
+                windows[-1] = (windows[-1][0], windows[-1][1] + 1)
+            else:
+                windows.append((earliest, 1))
+        return windows
+    
+    def _resume_time(self, account: str) -> float:
+        """When the window has room for a full batch of the account's queue (or all of it)"""
+        limit = self.limit(account)
+        needed = min(len(self.pending(account)), limit)
+        resume = self.plan(account)[0][0]
+        sends = self._recent_sends(account, time.time())
+        if len(sends) + needed > limit:
+            resume = max(resume, sends[len(sends) + needed - limit - 1] + self.window)
+        return resume
+    
+    def batches(self, accounts: List[str]) -> Iterator[List[Tuple[str, Dict]]]:
+        """
+        Yield queued (entry ID, recipient) pairs as the accounts' daily limits allow, until
+        none of them has anything queued
+        
+        A batch holds what every account may send now, in queue order (so the accounts'
+        emails stay interleaved). When all limits are reached the state is saved and the
+        generator sleeps until the first account has room again. Every recipient of a
+        batch must be recorded (sent, failed or quota exceeded) before asking for the
+        next one.
+        """
+        while True:
+            busy = [account for account in accounts if self.pending(account)]
+            if not busy:
+                return
+            allowance = {account: self.remaining(account) for account in busy}
+            batch = []
+            for entry_id, recipient in self.queue.items():
+                account = recipient.get("account", busy[0])
+                if allowance.get(account, 0) > 0:
+                    allowance[account] -= 1
+                    batch.append((entry_id, recipient))
+            if batch:
+                yield batch
+                continue
+            
+            resume = min(self._resume_time(account) for account in busy)
+            print(f"⏳ Daily limits reached for {', '.join(busy)}; "
+                  f"{len(self.queue)} queued emails resume at {format_time(resume)}")
+            self.save()
+            time.sleep(max(0.0, resume - time.time()))
+    
+    def record_sent(self, account: str, entry_id: str):
+        """Count a delivered email against the account and take it off the queue"""
+        self._account(account)["sent"].append(time.time())
+        self.queue.pop(entry_id, None)
+    
+    def record_failed(self, entry_id: str):
+        """Take an email the server rejected off the queue"""
+        self.queue.pop(entry_id, None)
+    
+    def record_quota_exceeded(self, account: str):
+        """The server says the quota is used up: keep the queue and pause the account"""
+        self._account(account)["blocked_until"] = time.time() + QUOTA_RETRY_DELAY
@@ -0,0 +1,212 @@
+"""
+SMTP Pool Module
+Keeps several logged-in SMTP sessions open so worker threads can send messages in
+parallel instead of waiting on one connection's round trips
+"""
+
+import queue
+import smtplib
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+
+try:
+    from .rate_limiter import RateLimiter, is_throttling_error
+except ImportError:
+    # Fallback for when utils is on sys.path directly
+    from rate_limiter import RateLimiter, is_throttling_error
+
+# Seconds a session may sit idle before it is checked with NOOP before reuse
+HEALTH_CHECK_IDLE = 30
+
+# Socket timeout for SMTP commands, in seconds
+SMTP_TIMEOUT = 60
+
+# Seconds to wait before reconnecting after a lost session (times the attempt number)
+RECONNECT_DELAY = 2
+
+# Reply code of a server closing the session ("service not available")
+SERVICE_CLOSING = 421
+
+
+def is_connection_error(error: Exception) -> bool:
+    """Whether a send failed because the session is gone rather than because of the message"""
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code == SERVICE_CLOSING
+    # Other SMTP errors (refused recipients, bad data, failed login) are about the
+    # message or account; SMTPException is an OSError, so check it before sockets
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+class SMTPConnection:
+    """
+    One SMTP session, opened on first use
+    
+    The session is reopened when it has sent max_messages messages (many providers end
+    long sessions on their own) and when it fails a NOOP check after sitting idle. If
+    the session is lost during a send (disconnect, socket error or a 421 reply), the
+    connection logs in again and resends the same message, up to send_attempts tries
+    in all with a growing pause in between. Throttling replies (421, 451, 4.7.x) slow
+    the rate limiter down before the retry. Other errors are raised at once.
+    """
+    
+    def __init__(self, config, max_messages: int = 100, send_attempts: int = 3,
+                 rate_limiter: Optional[RateLimiter] = None):
+        """
+        Args:
+            config: SMTP settings with smtp_server, smtp_port, email, password and use_tls
+            max_messages: Messages sent per session before it is replaced
+            send_attempts: Tries per message when the session is lost or throttled
+            rate_limiter: Paces every send attempt (may be shared between connections)
+        """
+        self.config = config
+        self.max_messages = max_messages
+        self.send_attempts = send_attempts
+        self.rate_limiter = rate_limiter
+        self.smtp = None
+        self.messages_sent = 0
+        self.last_used = 0.0
+    
+    def open(self):
+        """Open a new session (closing any current one) and log in"""
+        self.close()
+        smtp = smtplib.SMTP(self.config.smtp_server, self.config.smtp_port, timeout=SMTP_TIMEOUT)
+        try:
+            if self.config.use_tls:
+                smtp.starttls()
+            smtp.login(self.config.email, self.config.password)
+        except BaseException:
+            smtp.close()
+            raise
+        self.smtp = smtp
+        self.messages_sent = 0
+        self.last_used = time.monotonic()
+    
+    def close(self):
+        """End the session politely if possible"""
+        if self.smtp is None:
+            return
+        try:
+            self.smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self.smtp.close()
+        self.smtp = None
+    
+    def reset(self):
+        """Drop a broken session without the QUIT round trip"""
+        if self.smtp is not None:
+            try:
+                self.smtp.close()
+            except OSError:
+                pass
+            self.smtp = None
+    
+    def is_healthy(self) -> bool:
+        """Whether the server still answers on this session"""
+        try:
+            return self.smtp is not None and self.smtp.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+    
+    def ensure_open(self):
+        """Make sure there is a usable session, replacing a used-up or dead one"""
+        if self.smtp is None or self.messages_sent >= self.max_messages:
+            self.open()
+        elif time.monotonic() - self.last_used > HEALTH_CHECK_IDLE and not self.is_healthy():
+            self.open()
+    
+    def send_message(self, msg):
+        """Send a message, retrying it while the session drops or the server throttles"""
+        for attempt in range(1, self.send_attempts + 1):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            try:
+                self.ensure_open()
+                self.smtp.send_message(msg)
+                break
+            except Exception as e:
+                lost, throttled = is_connection_error(e), is_throttling_error(e)
+                if throttled and self.rate_limiter is not None:
+                    rate = self.rate_limiter.throttled()
+                    print(f"🐢 Server is throttling ({e}); slowing down to {rate:.2f} messages/sec")
+                if not (lost or throttled) or attempt == self.send_attempts:
+                    raise
+                if lost:
+                    self.reset()
+                print(f"🔄 Resending to {msg['To']} (attempt {attempt + 1}/{self.send_attempts})"
+                      + (f" after SMTP session loss ({e})" if lost else ""))
+                # The rate limiter spaces out retries after throttling
+                if lost or self.rate_limiter is None:
+                    time.sleep(RECONNECT_DELAY * attempt)
+        if self.rate_limiter is not None:
+            self.rate_limiter.succeeded()
+        self.messages_sent += 1
+        self.last_used = time.monotonic()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class SMTPConnectionPool:
+    """
+    Fixed number of SMTP connections shared by worker threads
+    
+    Each send borrows an idle connection (the most recently used one, so warm sessions
+    are reused and extra ones are only opened under load) and returns it afterwards.
+    All connections share one rate limiter, if given.
+    
+    Usage:
+        with SMTPConnectionPool(config, size=4) as pool:
+            pool.send_message(msg)  # from any number of threads
+    """
+    
+    def __init__(self, config, size: int = 4, max_messages_per_connection: int = 100,
+                 send_attempts: int = 3, rate_limiter: Optional[RateLimiter] = None):
+        if size < 1:
+            raise ValueError(f"Pool size must be at least 1, got {size}")
+        if max_messages_per_connection < 1:
+            raise ValueError(f"Messages per connection must be at least 1, got {max_messages_per_connection}")
+        if send_attempts < 1:
+            raise ValueError(f"Send attempts must be at least 1, got {send_attempts}")
+        
+        self.size = size
+        self._connections: List[SMTPConnection] = [
+            SMTPConnection(config, max_messages_per_connection, send_attempts, rate_limiter)
+            for _ in range(size)]
+        self._idle = queue.LifoQueue()
+        for connection in reversed(self._connections):
+            self._idle.put(connection)
+    
+    def open(self):
+        """Log in one connection up front, so bad settings fail before any work starts"""
+        with self.connection() as connection:
+            connection.ensure_open()
+    
+    @contextmanager
+    def connection(self):
+        """Borrow a connection, waiting until one is idle"""
+        connection = self._idle.get()
+        try:
+            yield connection
+        finally:
+            self._idle.put(connection)
+    
+    def send_message(self, msg):
+        with self.connection() as connection:
+            connection.send_message(msg)
+    
+    def close(self):
+        """Close every session (call once the worker threads are done)"""
+        for connection in self._connections:
+            connection.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -71,13 +71,21 @@ def show_system_status():
     print(f"📋 Email List (CSV):       {'✅' if status['email_list'] else '❌'}")
     print(f"📝 Email Template:         {'✅' if status['email_template'] else '❌'}")
     
-    # Check for generated certificates
-    cert_output_dir = Path("data/certificates/output")
-    if cert_output_dir.exists():
-        cert_files = list(cert_output_dir.glob("*.pdf"))
-        print(f"📜 Generated Certificates: {len(cert_files)} files")
+    # Certificate progress from the registry's status counters
+    registry_status = check_registry_status()
+    if registry_status.get('available'):
+        counts = registry_status['counts']
+        print(f"📜 Generated Certificates: {counts['pdf_generated']} of {counts['total']} registered")
+        print(f"📨 Awaiting Email:         {counts['pending_email']}")
+        print(f"🌐 Awaiting API Push:      {counts['pending_api']}")
     else:
-        print(f"📜 Generated Certificates: 0 files")
+        # No registry: count the generated files instead
+        cert_output_dir = Path("data/certificates/output")
+        if cert_output_dir.exists():
+            cert_files = list(cert_output_dir.glob("*.pdf"))
+            print(f"📜 Generated Certificates: {len(cert_files)} files")
+        else:
+            print(f"📜 Generated Certificates: 0 files")
     
     # Check API status
     print("\n🌐 Certificate Validator API:")
@@ -170,7 +178,8 @@ def debug_certificate_generation():
         print(f"   Total recipients: {results['total']}")
         print(f"   Successfully generated: {results['generated']}")
         print(f"   Failed: {results['failed']}")
-        print(f"   Output directory: {results['output_directory']}")
+        print(f"   Invalid roster lines: {results.get('invalid', 0)}")
+        print(f"   Output directory: {results.get('output_directory', '')}")
         
         if results['errors']:
             print(f"\n❌ Errors:")
@@ -236,8 +245,11 @@ def generate_certificates():
             print("SUCCESS: Certificates generated successfully!")
             print(f"RESULTS: {results['generated']}/{results['total']} certificates generated")
             
-            if results['failed'] > 0:
-                print(f"WARNING: {results['failed']} certificates failed to generate")
+            if results['failed'] > 0 or results.get('invalid'):
+                if results['failed'] > 0:
+                    print(f"WARNING: {results['failed']} certificates failed to generate")
+                if results.get('invalid'):
+                    print(f"WARNING: {results['invalid']} roster lines were invalid and skipped")
                 if results['errors']:
                     print("Errors:")
                     for error in results['errors']:
@@ -534,6 +546,29 @@ def show_help():
     
     input("\n🔙 Press Enter to return...")
 
+def check_registry_status():
+    """Get certificate counts by status from the certificate registry"""
+    try:
+        import sys
+        sys.path.append('src')
+        from utils.certificate_registry import read_status_counts
+        
+        # Don't create a registry just to report on it
+        registry_files = ["certificate_registry.json", "certificate_registry.journal", "certificate_registry.db"]
+        if not any(Path("data/certificates", name).exists() for name in registry_files):
+            return {"available": False, "error": "No certificate registry yet"}
+        
+        # Only the status counters are read, not the whole registry
+        return {
+            "available": True,
+            "counts": read_status_counts("data/certificates")
+        }
+    except Exception as e:
+        return {
+            "available": False,
+            "error": str(e)
+        }
+
 def check_api_status():
     """Check API connection status"""
     try:
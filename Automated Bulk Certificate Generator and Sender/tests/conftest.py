@@ -0,0 +1,43 @@
+"""Shared fixtures: a scratch data/ directory so tests never touch the real registry"""
+
+import json
+import os
+import shutil
+import sys
+
+import pytest
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_DIR, 'src'))
+
+from utils import certificate_registry  # noqa: E402
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """Project-like directory with data/certificates (template, config) as the working directory"""
+    base_dir = tmp_path / 'data' / 'certificates'
+    (base_dir / 'templates').mkdir(parents=True)
+    shutil.copy(os.path.join(PROJECT_DIR, 'data', 'certificates', 'templates', 'template_pdf.pdf'),
+                base_dir / 'templates' / 'template_pdf.pdf')
+    shutil.copy(os.path.join(PROJECT_DIR, 'data', 'certificates', 'config.json'), base_dir / 'config.json')
+    
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv('CERTIFICATE_REGISTRY_BACKEND', raising=False)
+    monkeypatch.setattr(certificate_registry, '_registry', None)
+    return tmp_path
+
+
+def write_roster(workspace, rows):
+    """Write data/certificates/recipients.txt from (name, course) pairs"""
+    path = workspace / 'data' / 'certificates' / 'recipients.txt'
+    path.write_text(''.join(f"{name},{course}\n" for name, course in rows), encoding='utf-8')
+    return path
+
+
+def set_render_engine(workspace, engine):
+    """Switch the workspace config's render engine"""
+    path = workspace / 'data' / 'certificates' / 'config.json'
+    config = json.loads(path.read_text(encoding='utf-8'))
+    config['render_engine'] = engine
+    path.write_text(json.dumps(config), encoding='utf-8')
@@ -0,0 +1,34 @@
+"""Account routing: stable, weighted assignment of recipients to sending accounts"""
+
+from utils.account_router import AccountRouter
+
+WEIGHTS = {'a@example.com': 2, 'b@example.com': 1, 'c@example.com': 1}
+RECIPIENTS = [f'student{i}@example.org' for i in range(4000)]
+
+
+def test_assignment_is_the_same_across_runs_and_orders():
+    first = AccountRouter(WEIGHTS)
+    first_run = {email: first.assign(email) for email in RECIPIENTS}
+    
+    # A rerun for a subset, in another order and spelling, picks the same accounts
+    rerun = AccountRouter(dict(reversed(list(WEIGHTS.items()))))
+    for email in reversed(RECIPIENTS[::7]):
+        assert rerun.assign(f'  {email.upper()} ') == first_run[email]
+
+
+def test_accounts_get_recipients_in_proportion_to_weight():
+    router = AccountRouter(WEIGHTS)
+    counts = dict.fromkeys(WEIGHTS, 0)
+    for email in RECIPIENTS:
+        counts[router.assign(email)] += 1
+    
+    for account, weight in WEIGHTS.items():
+        assert abs(counts[account] / len(RECIPIENTS) - weight / 4) < 0.03
+
+
+def test_pinned_account_wins():
+    router = AccountRouter(WEIGHTS)
+    email = RECIPIENTS[0]
+    other = next(account for account in WEIGHTS if account != router.assign(email))
+    router.pin(email, other)
+    assert router.assign(email.upper()) == other
@@ -0,0 +1,58 @@
+"""Certificate registry: legacy certificate_ids.log sync and export"""
+
+import json
+
+import pytest
+
+from utils import registry_store
+from utils.certificate_registry import CertificateRegistry, read_status_counts
+
+
+@pytest.mark.parametrize('backend', ['json', 'sqlite'])
+def test_imported_log_lines_are_not_exported_again(tmp_path, backend):
+    registry = CertificateRegistry(str(tmp_path), backend=backend)
+    registry.register_certificate('Jane Doe', 'Python Workshop', 'JANE0000000000000000')
+    registry.export_to_legacy_log()
+    
+    log_file = tmp_path / 'output' / 'certificate_ids.log'
+    with open(log_file, 'a', encoding='utf-8') as f:
+        f.write("EXTERNAL000000000000 | John Smith | Data Science\n")
+    
+    for _ in range(3):
+        registry.sync_with_legacy_log()
+        registry.export_to_legacy_log()
+    registry.register_certificate('Ann Lee', 'Docker', 'ANN00000000000000000')
+    registry.export_to_legacy_log()
+    
+    log = log_file.read_text(encoding='utf-8')
+    assert registry.get_by_certificate_id('EXTERNAL000000000000')['name'] == 'John Smith'
+    assert log.count('EXTERNAL000000000000') == 1
+    assert log.count('ANN00000000000000000') == 1
+
+
+def test_close_writes_the_snapshot(tmp_path):
+    registry = CertificateRegistry(str(tmp_path), backend='json')
+    registry.register_certificate('Jane Doe', 'Python Workshop', 'JANE0000000000000000')
+    registry.close()
+    
+    with open(tmp_path / 'certificate_registry.json', encoding='utf-8') as f:
+        snapshot = json.load(f)
+    assert [record['certificate_id'] for record in snapshot['certificates'].values()] == ['JANE0000000000000000']
+    assert (tmp_path / 'certificate_registry.journal').read_bytes() == b''
+
+
+@pytest.mark.parametrize('backend', ['json', 'sqlite'])
+def test_status_counts_are_read_without_loading_the_registry(tmp_path, monkeypatch, backend):
+    registry = CertificateRegistry(str(tmp_path), backend=backend)
+    registry.register_certificate('Jane Doe', 'Python Workshop', 'JANE0000000000000000', pdf_path='jane.pdf')
+    registry.register_certificate('John Smith', 'Docker', 'JOHN0000000000000000')
+    registry.update_certificate_status('Jane Doe', 'Python Workshop', email_sent=True)
+    expected = registry.status_counts()
+    registry.close()
+    
+    def no_full_load(*args, **kwargs):
+        raise AssertionError("the JSON registry was loaded")
+    monkeypatch.setattr(registry_store.JsonJournalStore, '__init__', no_full_load)
+    
+    assert read_status_counts(str(tmp_path), backend) == expected
+    assert expected['pending_email'] == 1 and expected['pdf_generated'] == 1
@@ -0,0 +1,67 @@
+"""Certificate generation: outputs must be valid PDFs that read back with their text"""
+
+import pytest
+from PyPDF2 import PdfReader
+
+from automations import fill_certificates
+from utils import certificate_registry
+from conftest import set_render_engine, write_roster
+
+
+@pytest.mark.parametrize('engine', ['auto', 'reportlab'])
+def test_generated_certificates_read_back(workspace, engine):
+    set_render_engine(workspace, engine)
+    write_roster(workspace, [('Jane Doe', 'Python Workshop'), ('John Smith', 'Data Science')])
+    
+    results = fill_certificates.generate_certificates('recipients.txt', 'config.json')
+    
+    assert results['generated'] == 2 and results['failed'] == 0
+    output_dir = workspace / 'data' / 'certificates' / 'output'
+    for name, course in [('Jane Doe', 'Python Workshop'), ('John Smith', 'Data Science')]:
+        pdf_path = output_dir / fill_certificates.certificate_filename(name, course)
+        text = PdfReader(str(pdf_path)).pages[0].extract_text()
+        assert name in text and course in text
+
+
+def test_cached_template_is_not_modified(workspace):
+    set_render_engine(workspace, 'reportlab')
+    base_dir = workspace / 'data' / 'certificates'
+    config = fill_certificates.load_config(str(base_dir / 'config.json'))
+    template_path = str(base_dir / 'templates' / 'template_pdf.pdf')
+    
+    for name in ('First Person', 'Second Person'):
+        fill_certificates.fill_certificate(template_path, config,
+                                           {'name': name, 'course': 'Course', 'certificate_id': 'ID'},
+                                           str(base_dir / f'{name}.pdf'))
+    
+    text = PdfReader(str(base_dir / 'Second Person.pdf')).pages[0].extract_text()
+    assert 'Second Person' in text and 'First Person' not in text
+
+
+def test_combined_output_keeps_existing_records(workspace):
+    write_roster(workspace, [('Jane Doe', 'Python Workshop')])
+    fill_certificates.generate_certificates('recipients.txt', 'config.json')
+    registry = certificate_registry.get_registry()
+    individual = registry.get_certificate('Jane Doe', 'Python Workshop')
+    
+    write_roster(workspace, [('Jane Doe', 'Python Workshop'), ('John Smith', 'Data Science')])
+    results = fill_certificates.generate_certificates('recipients.txt', 'config.json',
+                                                      combined_output='combined.pdf')
+    
+    assert results['generated'] == 2
+    assert registry.get_certificate('Jane Doe', 'Python Workshop') == individual
+    new_record = registry.get_certificate('John Smith', 'Data Science')
+    assert new_record['pdf_path'] is None and not new_record['pdf_generated']
+    assert new_record['combined_page'] == 2
+    combined = PdfReader(new_record['combined_pdf'])
+    assert individual['certificate_id'] in combined.pages[0].extract_text()
+    assert new_record['certificate_id'] in combined.pages[1].extract_text()
+
+
+def test_invalid_roster_lines_are_reported(workspace):
+    write_roster(workspace, [('Jane Doe', 'Python Workshop'), ('No Course', ''), ('John Smith', 'Data Science')])
+    
+    results = fill_certificates.generate_certificates('recipients.txt', 'config.json')
+    
+    assert results['generated'] == 2 and results['invalid'] == 1
+    assert any('line 2' in error for error in results['errors'])
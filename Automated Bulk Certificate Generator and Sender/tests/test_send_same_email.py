@@ -0,0 +1,74 @@
+"""Personalized sending: each recipient gets exactly their own certificate files"""
+
+import json
+import smtplib
+
+from automations import fill_certificates, send_same_email
+from conftest import write_roster
+from utils import certificate_registry
+
+
+class FakeSMTP:
+    """Records sent messages instead of talking to a server"""
+    sent = []
+    
+    def __init__(self, host, port, timeout=None):
+        pass
+    
+    def starttls(self):
+        pass
+    
+    def login(self, user, password):
+        pass
+    
+    def noop(self):
+        return 250, b'OK'
+    
+    def send_message(self, msg):
+        FakeSMTP.sent.append(msg)
+    
+    def quit(self):
+        pass
+    
+    def close(self):
+        pass
+
+
+def attachment_names(msg):
+    return sorted(part.get_filename().strip() for part in msg.walk() if part.get_filename())
+
+
+def test_combined_pdf_is_never_attached(workspace, monkeypatch):
+    # The sender falls back to registry stubs when its optional imports fail
+    assert send_same_email.get_recipient_certificates is certificate_registry.get_recipient_certificates
+    monkeypatch.setattr(smtplib, 'SMTP', FakeSMTP)
+    monkeypatch.setattr(FakeSMTP, 'sent', [])
+    monkeypatch.setattr(send_same_email, 'register_in_web_service', lambda *args: False)
+    
+    write_roster(workspace, [('Jane Doe', 'Python Workshop')])
+    fill_certificates.generate_certificates('recipients.txt', 'config.json')
+    write_roster(workspace, [('Jane Doe', 'Python Workshop'), ('John Smith', 'Data Science')])
+    fill_certificates.generate_certificates('recipients.txt', 'config.json', combined_output='combined.pdf')
+    # Registries written by earlier versions point combined-mode records at the print file
+    certificate_registry.get_registry().register_certificate(
+        'Old Record', 'Python Workshop', 'OLDRECORD00000000000',
+        pdf_path='data/certificates/output/combined.pdf')
+    
+    emails_dir = workspace / 'data' / 'emails'
+    emails_dir.mkdir()
+    (emails_dir / 'email_list.csv').write_text(
+        'name,email\nJane Doe,jane@example.com\nJohn Smith,john@example.com\nOld Record,old@example.com\n',
+        encoding='utf-8')
+    (emails_dir / 'email_config.json').write_text(json.dumps({
+        'smtp_server': 'smtp.example.com', 'smtp_port': 587,
+        'email': 'sender@example.com', 'password': 'secret'}), encoding='utf-8')
+    
+    results = send_same_email.send_personalized_emails_with_certificates(
+        str(emails_dir / 'email_list.csv'), 'Your certificate', 'Hi {name}: {course_name} {cert_id}',
+        str(emails_dir / 'email_config.json'), str(emails_dir / 'attachments'))
+    
+    assert results['sent'] == 3
+    attachments = {msg['To']: attachment_names(msg) for msg in FakeSMTP.sent}
+    assert attachments['jane@example.com'] == ['Jane_Doe_Python_Workshop_certificate.pdf']
+    assert attachments['john@example.com'] == []
+    assert attachments['old@example.com'] == []